@@ -0,0 +1,163 @@
+"""Замеры времени и памяти для основных этапов парсера.
+
+Запуск из корня репозитория:
+
+    python -m benchmarks.run_benchmarks                   # сравнить с baseline.json
+    python -m benchmarks.run_benchmarks --save-baseline   # перезаписать baseline.json
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+from benchmarks.workbook_generator import generate_schedule_page, generate_workbook, lesson_cell
+
+import schedule_diff
+import schedule_parser
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+
+# Размеры синтетических файлов: (имя, групп, дней, доля заполненных ячеек)
+SIZES = [
+    ("small", 10, 6, 0.6),
+    ("medium", 50, 6, 0.6),
+    ("large", 200, 6, 0.6),
+]
+REPEATS = 5
+DEFAULT_TOLERANCE = 0.25
+
+def measure(func, repeats=REPEATS, setup=None):
+    """Лучшее время из repeats запусков и пик памяти одного запуска"""
+    best = float('inf')
+    for _ in range(repeats):
+        if setup:
+            setup()
+        started = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - started)
+
+    if setup:
+        setup()
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {"time": round(best, 6), "peak_kb": round(peak / 1024, 1)}
+
+def clear_caches():
+    schedule_parser._parse_normalized_cell.cache_clear()
+
+def quiet(func):
+    """Подавляет отладочный вывод парсера во время замера"""
+    def wrapper():
+        with contextlib.redirect_stdout(io.StringIO()):
+            return func()
+    return wrapper
+
+def run_benchmarks():
+    results = {}
+
+    for size_name, groups, days, fill_rate in SIZES:
+        xls_content = generate_workbook(groups, days, fill_rate)
+        with contextlib.redirect_stdout(io.StringIO()):
+            lessons_by_group = schedule_parser.parse_xls_all_groups(xls_content)
+        target_group = next(iter(lessons_by_group))
+        lessons = lessons_by_group[target_group]
+
+        results[f"parse_xls_schedule/{size_name}"] = measure(
+            quiet(lambda: schedule_parser.parse_xls_schedule(xls_content, target_group)),
+            setup=clear_caches)
+        results[f"parse_xls_all_groups/{size_name}"] = measure(
+            quiet(lambda: schedule_parser.parse_xls_all_groups(xls_content)),
+            setup=clear_caches)
+
+        all_lessons = [lesson for group_lessons in lessons_by_group.values()
+                       for lesson in group_lessons]
+        results[f"schedule_to_ical/{size_name}"] = measure(
+            quiet(lambda: sum(1 for _ in schedule_parser.schedule_to_ical(all_lessons, target_group))))
+        previous_state = schedule_diff.build_state(lessons_by_group)
+        results[f"schedule_diff/{size_name}"] = measure(
+            lambda: schedule_diff.diff_states(previous_state, schedule_diff.build_state(lessons_by_group)))
+
+        print(f"{size_name}: {groups} групп, {len(all_lessons)} занятий, "
+              f"{len(lessons)} у {target_group}", file=sys.stderr)
+
+    # Лекции потоков в объединенных ячейках на несколько групп
+    streams_content = generate_workbook(200, 6, 0.6, stream_rate=0.2)
+    results["parse_xls_all_groups/streams"] = measure(
+        quiet(lambda: schedule_parser.parse_xls_all_groups(streams_content)),
+        setup=clear_caches)
+
+    rnd = random.Random(0)
+    cells = [lesson_cell(rnd) for _ in range(2000)]
+    results["parse_lesson_cell_detailed/cold"] = measure(
+        lambda: [schedule_parser.parse_lesson_cell_detailed(cell) for cell in cells],
+        setup=clear_caches)
+    results["parse_lesson_cell_detailed/warm"] = measure(
+        lambda: [schedule_parser.parse_lesson_cell_detailed(cell) for cell in cells])
+
+    page = generate_schedule_page()
+    results["find_latest_schedule_url/page"] = measure(
+        quiet(lambda: schedule_parser.find_latest_schedule_url(page)))
+
+    return results
+
+def compare_with_baseline(results, baseline, tolerance):
+    """Печатает сравнение и возвращает список регрессий"""
+    regressions = []
+    print(f"{'бенчмарк':45} {'время, мс':>12} {'baseline':>12} {'изм.':>8} {'пик, КБ':>10}")
+    for name, result in results.items():
+        base = baseline.get(name)
+        time_ms = result["time"] * 1000
+        if base:
+            change = result["time"] / base["time"] - 1 if base["time"] else 0.0
+            marker = " ❌" if change > tolerance else ""
+            if change > tolerance:
+                regressions.append(name)
+            print(f"{name:45} {time_ms:12.2f} {base['time'] * 1000:12.2f} "
+                  f"{change:+8.0%} {result['peak_kb']:10.1f}{marker}")
+        else:
+            print(f"{name:45} {time_ms:12.2f} {'—':>12} {'':>8} {result['peak_kb']:10.1f}")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="Бенчмарки парсера расписания")
+    parser.add_argument('--save-baseline', action='store_true',
+                        help="сохранить результаты как новый baseline")
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE,
+                        help="допустимое замедление относительно baseline (0.25 = 25%%)")
+    parser.add_argument('--output', help="сохранить результаты в JSON файл")
+    args = parser.parse_args()
+
+    results = run_benchmarks()
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2, ensure_ascii=False)
+
+    if args.save_baseline:
+        with open(BASELINE_PATH, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2, ensure_ascii=False)
+            f.write('\n')
+        print(f"Baseline сохранен в {BASELINE_PATH}")
+        return 0
+
+    baseline = {}
+    if os.path.exists(BASELINE_PATH):
+        with open(BASELINE_PATH, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+
+    regressions = compare_with_baseline(results, baseline, args.tolerance)
+    if regressions:
+        print(f"❌ Замедление больше {args.tolerance:.0%}: {', '.join(regressions)}")
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
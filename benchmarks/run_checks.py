@@ -0,0 +1,171 @@
+"""Регрессионные проверки на локальном стенде вместо misis.ru и Telegram.
+
+Каждая проверка воспроизводит сценарий, который уже ломался, в своем
+рабочем каталоге с пустым кешем. Код выхода 1, если хоть одна не прошла.
+
+    python -m benchmarks.run_checks
+"""
+import contextlib
+import io
+import os
+import sys
+import tempfile
+
+from benchmarks.standin_server import build_synthetic_fixtures, stand_in_environment, start_server
+from benchmarks.workbook_generator import generate_workbook
+
+PAGE_KEY = "GET /misis/students/schedule/"
+
+def schedule_page(filename):
+    return ('<html><body><h1>Расписание</h1>'
+            f'<a href="/files/{filename}">ИТКН 1 курс</a>'
+            '</body></html>').encode('utf-8')
+
+def run_quietly(function, *args, **kwargs):
+    """Вызывает функцию парсера без отладочного вывода и предупреждений"""
+    with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(io.StringIO()):
+        return function(*args, **kwargs)
+
+def check_new_link_after_failed_download(fixtures):
+    """Новая ссылка остается заметной для --check, если ее файл не скачался.
+
+    Полный запуск сохраняет страницу в кеш до скачивания файла, поэтому
+    страница для --check выглядит неизменной.
+    """
+    import schedule_parser
+
+    run_quietly(schedule_parser.run, schedule_parser.parse_args([]))
+    old_url = schedule_parser.load_remembered_schedule_url()
+    assert run_quietly(schedule_parser.check_for_updates) == schedule_parser.CHECK_UNCHANGED, \
+        "после полного запуска --check должен сообщать об отсутствии изменений"
+
+    fixtures.add(PAGE_KEY, 200, {"Content-Type": "text/html; charset=utf-8"}, schedule_page('itkn_080925.xls'))
+    fixtures.add("GET /misis/files/itkn_080925.xls", 503, {"Content-Type": "text/plain"}, b'Service Unavailable')
+    run_quietly(schedule_parser.run, schedule_parser.parse_args([]))
+    assert schedule_parser.load_remembered_schedule_url() == old_url, \
+        "несостоявшееся скачивание не должно менять обработанную ссылку"
+
+    for pooled in (False, True):
+        status = run_quietly(schedule_parser.check_for_updates, pooled=pooled)
+        assert status == schedule_parser.CHECK_CHANGED, \
+            f"новая ссылка после ошибки скачивания не найдена (pooled={pooled})"
+
+    fixtures.add("GET /misis/files/itkn_080925.xls", 200, {"Content-Type": "application/vnd.ms-excel"},
+                 generate_workbook(5, 6, 0.6, 1))
+    run_quietly(schedule_parser.run, schedule_parser.parse_args([]))
+    assert schedule_parser.load_remembered_schedule_url() != old_url, "новый файл не обработан"
+    assert run_quietly(schedule_parser.check_for_updates) == schedule_parser.CHECK_UNCHANGED, \
+        "после обработки нового файла --check должен сообщать об отсутствии изменений"
+
+# Текст ячейки → (предмет, четность): 0 — все недели, 1 — нечетные, 2 — четные
+WEEK_MARKER_CASES = [
+    ('Учет недвижимости (Лекционные) Иванов И.И. Б-412', 'Учет недвижимости', 0),
+    ('Отчет недели (Практические) Иванов И.И. Б-412', 'Отчет недели', 0),
+    ('Физика (1 нед.) Иванов И.И. Б-412', 'Физика', 1),
+    ('Физика II нед. Иванов И.И. Б-412', 'Физика', 2),
+    ('Физика по нечетным неделям Иванов И.И. Б-412', 'Физика', 1),
+]
+SHEET_WEEK_CASES = [
+    ('Учет недвижимости', 0),
+    ('11 неделя', 0),
+    ('Нечетная неделя', 1),
+    ('Четная неделя', 2),
+]
+
+def check_week_markers(fixtures):
+    """Отметка недели ищется только целыми словами, а не внутри «Учет» или «11 неделя»"""
+    import schedule_parser
+
+    for text, subject, week in WEEK_MARKER_CASES:
+        lesson = schedule_parser.parse_lesson_cell_detailed(text)
+        assert (lesson["subject"], lesson["week"]) == (subject, week), \
+            f"{text!r}: {lesson['subject']!r}, неделя {lesson['week']}; ожидалось {subject!r}, неделя {week}"
+    for name, week in SHEET_WEEK_CASES:
+        assert schedule_parser.sheet_week(name) == week, \
+            f"лист {name!r}: неделя {schedule_parser.sheet_week(name)}, ожидалась {week}"
+
+def check_link_selection(fixtures):
+    """Ссылка ИТКН определяется по всему пути, .xlsx не теряется, курс группы важнее даты"""
+    import schedule_parser
+
+    page = ('<html><body><h2>Институт компьютерных наук</h2>'
+            '<a href="/files/itkn_080925.xls">2 курс</a>'
+            '<a href="/files/itkn_010925.xlsx">1 курс</a>'
+            '<h2>Институт экономики</h2>'
+            '<a href="/files/ie_150925.xls">1 курс</a>'
+            '</body></html>').encode('utf-8')
+    url = run_quietly(schedule_parser.find_latest_schedule_url, page)
+    assert url and url.endswith('/files/itkn_010925.xlsx'), f"выбрана {url}, ожидался файл 1 курса .xlsx"
+
+    page = ('<html><body><a href="/upload/other/raspisanie.xls">Расписание</a>'
+            '<a href="/upload/itkn/raspisanie.xls">Расписание</a></body></html>').encode('utf-8')
+    url = run_quietly(schedule_parser.find_latest_schedule_url, page)
+    assert url and url.endswith('/upload/itkn/raspisanie.xls'), f"выбрана {url}, ожидалась ссылка из каталога itkn"
+
+def check_day_range(fixtures):
+    """Дни вне недели отбрасываются при разборе и не попадают в маски занятости и календарь"""
+    import ics_writer
+    import occupancy
+    import schedule_parser
+    from lesson_model import Lesson
+
+    # Восемь блоков пар 1–7: восьмого дня в неделе нет
+    slots = [str(slot) for _ in range(8) for slot in range(1, 8)]
+    grid = [['День'] + [''] * len(slots), ['Пара'] + slots]
+    slot_index = run_quietly(schedule_parser.build_slot_index, grid)
+    assert max(day for _, _, day in slot_index) == 6, "на листе остались дни после воскресенья"
+
+    lesson = Lesson('Физика', 7, 3, location='Б-412', teacher='Иванов И.И.')
+    indexes = run_quietly(occupancy.build_indexes, {'ББИ-25-2': [lesson]})
+    assert not indexes["rooms"] and not indexes["teachers"], "занятие восьмого дня попало в маски"
+    try:
+        occupancy.slot_bit(7, 3)
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("slot_bit принял восьмой день")
+    try:
+        list(ics_writer.iter_event_lines(lesson, 'ББИ-25-2', 'uid', schedule_parser.SEMESTER, '', ''))
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("календарь молча пропустил занятие восьмого дня")
+
+CHECKS = [
+    check_new_link_after_failed_download,
+    check_week_markers,
+    check_link_selection,
+    check_day_range,
+]
+
+def main():
+    failures = 0
+    with tempfile.TemporaryDirectory(prefix='schedule-checks-') as work_root:
+        server, base_url = start_server(build_synthetic_fixtures(os.path.join(work_root, 'fixtures'), 5))
+        # Модули читают адреса из окружения при импорте, поэтому проверки импортируют их после настройки стенда
+        os.environ.update(stand_in_environment(base_url))
+        os.environ.update({'TELEGRAM_BOT_TOKEN': 'stand-in', 'TELEGRAM_CHAT_ID': '1'})
+
+        cwd = os.getcwd()
+        try:
+            for check in CHECKS:
+                # Каждой проверке — свои фикстуры и рабочий каталог с пустым кешем
+                check_root = os.path.join(work_root, check.__name__)
+                server.fixtures = build_synthetic_fixtures(os.path.join(check_root, 'fixtures'), 5)
+                os.makedirs(os.path.join(check_root, 'work'))
+                os.chdir(os.path.join(check_root, 'work'))
+                try:
+                    check(server.fixtures)
+                    print(f"✅ {check.__name__}")
+                except AssertionError as e:
+                    failures += 1
+                    print(f"❌ {check.__name__}: {e}")
+                finally:
+                    os.chdir(cwd)
+        finally:
+            os.chdir(cwd)
+            server.shutdown()
+    return 1 if failures else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,126 @@
+"""Сквозной замер main() на локальном стенде вместо misis.ru и Telegram.
+
+Каждый прогон выполняет полную обработку: поиск ссылки, скачивание,
+парсинг, историю, календари, сравнение и уведомления. По умолчанию
+прогоны холодные (свой рабочий каталог и пустой кеш на каждый прогон),
+с --warm все прогоны используют один каталог, как --watch.
+
+    python -m benchmarks.run_e2e --runs 20
+    python -m benchmarks.run_e2e --fixtures fixtures/ --latency-ms 80 --bandwidth 2000000
+    python -m benchmarks.run_e2e --error-rate 503=0.05,429=0.05 --seed 1
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import sys
+import tempfile
+import time
+
+from benchmarks.standin_server import (Fixtures, add_fault_arguments, build_synthetic_fixtures,
+                                       faults_from_args, stand_in_environment, start_server)
+
+DEFAULT_RUNS = 20
+PERCENTILES = (50, 95, 99)
+
+def percentile(values, p):
+    """Процентиль методом ближайшего ранга"""
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    rank = max(1, -(-len(ordered) * p // 100))
+    return ordered[int(rank) - 1]
+
+def summarize(values):
+    summary = {f"p{p}": round(percentile(values, p), 2) for p in PERCENTILES}
+    summary["max"] = round(max(values), 2) if values else 0.0
+    summary["mean"] = round(sum(values) / len(values), 2) if values else 0.0
+    return summary
+
+def run_pipeline(runs, warm, work_root):
+    """Выполняет runs прогонов; возвращает список (мс, успех, замеры этапов)"""
+    # Модули читают адреса из окружения при импорте, поэтому импорт после настройки стенда
+    import metrics
+    import schedule_parser
+
+    results = []
+    shared_dir = os.path.join(work_root, 'warm')
+    for run_index in range(runs):
+        work_dir = shared_dir if warm else os.path.join(work_root, f"run-{run_index}")
+        os.makedirs(work_dir, exist_ok=True)
+        os.chdir(work_dir)
+        if not warm:
+            schedule_parser._parse_normalized_cell.cache_clear()
+        metrics.reset()
+
+        started = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            schedule_parser.run(schedule_parser.parse_args([]))
+        elapsed_ms = (time.perf_counter() - started) * 1000
+
+        stages = {}
+        for record in metrics.get_records():
+            stages[record["stage"]] = stages.get(record["stage"], 0.0) + record["wall_ms"]
+        results.append((elapsed_ms, os.path.exists('schedule.ics'), stages))
+    return results
+
+def report(results, wall_seconds):
+    totals = [elapsed for elapsed, _, _ in results]
+    failures = sum(1 for _, ok, _ in results if not ok)
+    stage_names = sorted({stage for _, _, stages in results for stage in stages})
+
+    summary = {
+        "runs": len(results),
+        "failures": failures,
+        "throughput_per_s": round(len(results) / wall_seconds, 2) if wall_seconds else 0.0,
+        "total_ms": summarize(totals),
+        "stages_ms": {stage: summarize([stages[stage] for _, _, stages in results if stage in stages])
+                      for stage in stage_names},
+    }
+
+    print(f"{'этап':24} {'p50, мс':>10} {'p95, мс':>10} {'p99, мс':>10} {'max, мс':>10}")
+    for name, values in [("всего", summary["total_ms"])] + list(summary["stages_ms"].items()):
+        print(f"{name:24} {values['p50']:10.2f} {values['p95']:10.2f} {values['p99']:10.2f} {values['max']:10.2f}")
+    print(f"Прогонов: {summary['runs']}, неудачных: {failures}, "
+          f"пропускная способность: {summary['throughput_per_s']} прогонов/с")
+    return summary
+
+def main():
+    parser = argparse.ArgumentParser(description="Сквозной бенчмарк на локальном стенде")
+    parser.add_argument('--fixtures', help="каталог фикстур (по умолчанию синтетические)")
+    parser.add_argument('--groups', type=int, default=50, help="число групп в синтетических фикстурах")
+    parser.add_argument('--runs', type=int, default=DEFAULT_RUNS)
+    parser.add_argument('--warm', action='store_true', help="один рабочий каталог и кеш на все прогоны")
+    parser.add_argument('--output', help="сохранить сводку в JSON файл")
+    add_fault_arguments(parser)
+    args = parser.parse_args()
+
+    output = os.path.abspath(args.output) if args.output else None
+    with tempfile.TemporaryDirectory(prefix='schedule-e2e-') as work_root:
+        if args.fixtures:
+            fixtures = Fixtures(args.fixtures)
+        else:
+            fixtures = build_synthetic_fixtures(os.path.join(work_root, 'fixtures'), args.groups)
+
+        server, base_url = start_server(fixtures, faults_from_args(args))
+        os.environ.update(stand_in_environment(base_url))
+        # Настоящие токен и чаты не используются даже при наличии в окружении
+        os.environ.update({'TELEGRAM_BOT_TOKEN': 'stand-in', 'TELEGRAM_CHAT_ID': '1'})
+
+        cwd = os.getcwd()
+        started = time.perf_counter()
+        try:
+            results = run_pipeline(args.runs, args.warm, work_root)
+        finally:
+            os.chdir(cwd)
+            server.shutdown()
+        summary = report(results, time.perf_counter() - started)
+
+    if output:
+        with open(output, 'w', encoding='utf-8') as f:
+            json.dump(summary, f, indent=2, ensure_ascii=False)
+    return 1 if summary["failures"] else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
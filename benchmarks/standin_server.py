@@ -0,0 +1,284 @@
+"""Локальный стенд вместо misis.ru и api.telegram.org.
+
+Ответы хранятся в каталоге фикстур:
+
+    fixtures.json      — адреса upstream и ответы по ключу "МЕТОД /префикс/путь"
+    bodies/<sha256>    — тела ответов
+
+Путь запроса начинается с префикса upstream: /misis/... для сайта МИСИС,
+/telegram/... для Bot API. Токен бота в путях Telegram не сохраняется.
+
+В режиме записи стенд проксирует запросы к настоящим серверам и
+сохраняет ответы, в режиме воспроизведения отдает их из фикстур с
+настраиваемой задержкой, ограничением скорости и внедрением ошибок
+(зависание, 503, 429).
+
+    python -m benchmarks.standin_server record fixtures/ --port 8765
+    python -m benchmarks.standin_server serve fixtures/ --port 8765 --latency-ms 50 --error-rate 503=0.05
+"""
+import argparse
+import hashlib
+import json
+import os
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from atomic_file import write_atomic
+from benchmarks.workbook_generator import generate_workbook
+
+UPSTREAMS = {
+    "misis": "https://misis.ru",
+    "telegram": "https://api.telegram.org",
+}
+FIXTURES_NAME = 'fixtures.json'
+BODIES_DIR = 'bodies'
+
+# Заголовки ответа, которые сохраняются в фикстурах
+KEPT_HEADERS = ('Content-Type', 'ETag', 'Last-Modified', 'Retry-After')
+BOT_TOKEN_PATTERN = re.compile(r'/bot[^/]+/')
+CHUNK_SIZE = 16 * 1024
+ERROR_KINDS = ('timeout', '503', '429')
+
+def request_key(method, path):
+    """Ключ ответа в фикстурах; токен бота заменяется заглушкой"""
+    return f"{method} {BOT_TOKEN_PATTERN.sub('/bot<token>/', path)}"
+
+class Fixtures:
+    """Каталог записанных ответов"""
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.lock = threading.Lock()
+        try:
+            with open(os.path.join(directory, FIXTURES_NAME), 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            data = {}
+        self.upstreams = data.get("upstreams", dict(UPSTREAMS))
+        self.responses = data.get("responses", {})
+
+    def body(self, entry):
+        with open(os.path.join(self.directory, BODIES_DIR, entry["body"]), 'rb') as f:
+            return f.read()
+
+    def add(self, key, status, headers, body):
+        digest = hashlib.sha256(body).hexdigest()
+        os.makedirs(os.path.join(self.directory, BODIES_DIR), exist_ok=True)
+        with open(os.path.join(self.directory, BODIES_DIR, digest), 'wb') as f:
+            f.write(body)
+        with self.lock:
+            self.responses[key] = {"status": status, "headers": headers, "body": digest}
+            self.save()
+
+    def save(self):
+        write_atomic(os.path.join(self.directory, FIXTURES_NAME),
+                     json.dumps({"upstreams": self.upstreams, "responses": self.responses},
+                                ensure_ascii=False, indent=1, sort_keys=True))
+
+def build_synthetic_fixtures(directory, groups=50, days=6, seed=0):
+    """Фикстуры без сети: страница со ссылкой, сгенерированный XLS и ответы Telegram"""
+    fixtures = Fixtures(directory)
+    page = ('<html><body><h1>Расписание</h1>'
+            '<a href="/files/itkn_010925.xls">ИТКН 1 курс</a>'
+            '</body></html>').encode('utf-8')
+    xls = generate_workbook(groups, days, 0.6, seed)
+    xls_etag = f'"{hashlib.sha256(xls).hexdigest()[:16]}"'
+    telegram_ok = json.dumps({"ok": True, "result": {"message_id": 1}}).encode('utf-8')
+
+    fixtures.add("GET /misis/students/schedule/", 200, {"Content-Type": "text/html; charset=utf-8"}, page)
+    fixtures.add("GET /misis/files/itkn_010925.xls", 200,
+                 {"Content-Type": "application/vnd.ms-excel", "ETag": xls_etag}, xls)
+    fixtures.add("HEAD /misis/files/itkn_010925.xls", 200,
+                 {"Content-Type": "application/vnd.ms-excel", "ETag": xls_etag}, b'')
+    fixtures.add("POST /telegram/bot<token>/sendMessage", 200, {"Content-Type": "application/json"}, telegram_ok)
+    return fixtures
+
+class FaultConfig:
+    """Задержка, пропускная способность и вероятности ошибок"""
+
+    def __init__(self, latency_ms=0.0, jitter_ms=0.0, bandwidth=None, error_rates=None,
+                 hang_seconds=35.0, seed=None):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.bandwidth = bandwidth
+        self.error_rates = error_rates or {}
+        self.hang_seconds = hang_seconds
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+
+    def delay(self):
+        with self.lock:
+            jitter = self.random.uniform(0, self.jitter_ms)
+        return (self.latency_ms + jitter) / 1000
+
+    def pick_error(self):
+        """Случайная ошибка для запроса или None"""
+        with self.lock:
+            roll = self.random.random()
+        for kind in ERROR_KINDS:
+            rate = self.error_rates.get(kind, 0.0)
+            if roll < rate:
+                return kind
+            roll -= rate
+        return None
+
+def parse_error_rates(value):
+    """'503=0.05,429=0.01,timeout=0.01' → словарь вероятностей"""
+    rates = {}
+    for item in filter(None, value.split(',')):
+        kind, _, rate = item.partition('=')
+        if kind not in ERROR_KINDS:
+            raise argparse.ArgumentTypeError(f"неизвестный тип ошибки: {kind}")
+        rates[kind] = float(rate)
+    return rates
+
+class StandInHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    server_version = 'StandIn/1.0'
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        self.handle_request()
+
+    def do_HEAD(self):
+        self.handle_request()
+
+    def do_POST(self):
+        self.handle_request()
+
+    def handle_request(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        request_body = self.rfile.read(length) if length else b''
+        fixtures = self.server.fixtures
+        faults = self.server.faults
+
+        time.sleep(faults.delay())
+        error = faults.pick_error()
+        if error == 'timeout':
+            time.sleep(faults.hang_seconds)
+            self.close_connection = True
+            return
+        if error == '503':
+            self.send_payload(503, {"Content-Type": "text/plain"}, b'Service Unavailable')
+            return
+        if error == '429':
+            body = json.dumps({"ok": False, "error_code": 429, "description": "Too Many Requests: retry after 1",
+                               "parameters": {"retry_after": 1}}).encode('utf-8')
+            self.send_payload(429, {"Content-Type": "application/json", "Retry-After": "1"}, body)
+            return
+
+        key = request_key(self.command, self.path)
+        if self.server.record:
+            status, headers, body = self.forward(request_body)
+            fixtures.add(key, status, headers, body)
+        else:
+            entry = fixtures.responses.get(key)
+            if entry is None:
+                self.send_payload(404, {"Content-Type": "text/plain"}, b'No fixture')
+                return
+            status, headers, body = entry["status"], entry["headers"], fixtures.body(entry)
+
+        etag = headers.get('ETag')
+        if etag and self.headers.get('If-None-Match') == etag:
+            self.send_payload(304, {"ETag": etag}, b'')
+            return
+        self.send_payload(status, headers, body)
+
+    def forward(self, request_body):
+        """Проксирует запрос к настоящему серверу (режим записи)"""
+        import requests
+
+        prefix, _, rest = self.path.lstrip('/').partition('/')
+        upstream = self.server.fixtures.upstreams[prefix]
+        headers = {name: value for name, value in self.headers.items()
+                   if name.lower() in ('content-type', 'user-agent', 'accept')}
+        response = requests.request(self.command, f"{upstream}/{rest}", data=request_body or None,
+                                    headers=headers, timeout=60)
+        kept = {name: response.headers[name] for name in KEPT_HEADERS if name in response.headers}
+        return response.status_code, kept, response.content
+
+    def send_payload(self, status, headers, body):
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        if self.command == 'HEAD' or status == 304:
+            return
+
+        bandwidth = self.server.faults.bandwidth
+        if not bandwidth:
+            self.wfile.write(body)
+            return
+        for offset in range(0, len(body), CHUNK_SIZE):
+            chunk = body[offset:offset + CHUNK_SIZE]
+            self.wfile.write(chunk)
+            time.sleep(len(chunk) / bandwidth)
+
+def start_server(fixtures, faults=None, host='127.0.0.1', port=0, record=False):
+    """Запускает стенд в фоновом потоке; возвращает (сервер, базовый адрес)"""
+    server = ThreadingHTTPServer((host, port), StandInHandler)
+    server.daemon_threads = True
+    server.fixtures = fixtures
+    server.faults = faults or FaultConfig()
+    server.record = record
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}"
+
+def stand_in_environment(base_url):
+    """Переменные окружения, направляющие парсер на стенд"""
+    return {
+        'MISIS_SCHEDULE_URL': f"{base_url}/misis/students/schedule/",
+        'MISIS_FILES_URL': f"{base_url}/misis",
+        'TELEGRAM_API_URL': f"{base_url}/telegram",
+    }
+
+def add_fault_arguments(parser):
+    parser.add_argument('--latency-ms', type=float, default=0.0, help="задержка перед ответом")
+    parser.add_argument('--jitter-ms', type=float, default=0.0, help="случайная добавка к задержке")
+    parser.add_argument('--bandwidth', type=float, help="скорость отдачи тела, байт/с")
+    parser.add_argument('--error-rate', type=parse_error_rates, default={},
+                        help="вероятности ошибок, например 503=0.05,429=0.01,timeout=0.01")
+    parser.add_argument('--hang-seconds', type=float, default=35.0,
+                        help="сколько держать соединение при ошибке timeout")
+    parser.add_argument('--seed', type=int, help="seed для воспроизводимых ошибок")
+
+def faults_from_args(args):
+    return FaultConfig(args.latency_ms, args.jitter_ms, args.bandwidth, args.error_rate,
+                       args.hang_seconds, args.seed)
+
+def main():
+    parser = argparse.ArgumentParser(description="Локальный стенд misis.ru и Telegram")
+    parser.add_argument('mode', choices=['record', 'serve', 'synthetic'],
+                        help="record — проксировать и записывать, serve — воспроизводить, "
+                             "synthetic — создать фикстуры без сети")
+    parser.add_argument('fixtures', help="каталог фикстур")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--groups', type=int, default=50, help="число групп для synthetic")
+    add_fault_arguments(parser)
+    args = parser.parse_args()
+
+    if args.mode == 'synthetic':
+        build_synthetic_fixtures(args.fixtures, args.groups)
+        print(f"Фикстуры сохранены в {args.fixtures}")
+        return
+
+    fixtures = Fixtures(args.fixtures)
+    server, base_url = start_server(fixtures, faults_from_args(args), args.host, args.port,
+                                    record=args.mode == 'record')
+    print(f"Стенд запущен на {base_url}, окружение для парсера:")
+    for name, value in stand_in_environment(base_url).items():
+        print(f"  export {name}={value}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""Генератор синтетических XLS файлов в формате расписания МИСИС.
+
+Лист устроен так же, как ожидает parse_xls_schedule: строка-шапка
+с названиями групп, номера пар 1–7 в колонке 1 и ячейки вида
+"Математика (Практические) Иванов И.И. Б-412".
+
+С stream_rate > 0 часть пар становится лекциями потока: одна
+объединенная ячейка на несколько соседних групп, как в файлах МИСИС.
+"""
+import argparse
+import io
+import random
+
+import xlwt
+
+from lesson_model import DAY_NAMES
+
+SUBJECTS = [
+    "Математика", "История России", "Информатика", "Иностранный язык",
+    "Физика", "Программирование", "Дискретная математика", "Философия",
+    "Базы данных", "Алгоритмы и структуры данных", "Экономика", "Физическая культура",
+]
+LESSON_TYPES = ["Лекционные", "Практические", "Лабораторные"]
+TEACHERS = [
+    "Иванов И.И.", "Петров П.П.", "Казанцев А. В.", "Булатов И. А.",
+    "Владимиров А.А.", "Смирнова Е.Н.", "Кузнецов Д.С.", "Орлова М.В.",
+]
+ROOMS = ["Б-412", "Л-550", "Г-301", "А-205", "К-117", "Б-634", "Л-221"]
+# В файлах МИСИС занятия идут с понедельника по субботу
+SHEET_DAYS = DAY_NAMES[:6]
+LESSONS_PER_DAY = 7
+
+def group_names(groups):
+    """Названия групп в формате "ББИ-25-1" с разными направлениями"""
+    prefixes = ["ББИ", "БПМ", "БИВТ", "БИСТ", "БПИ"]
+    return [f"{prefixes[i % len(prefixes)]}-25-{i // len(prefixes) + 1}" for i in range(groups)]
+
+def lesson_cell(rnd):
+    return (f"{rnd.choice(SUBJECTS)} ({rnd.choice(LESSON_TYPES)}) "
+            f"{rnd.choice(TEACHERS)} {rnd.choice(ROOMS)}")
+
+STREAM_WIDTH = (2, 5)  # групп в потоке
+
+def generate_workbook(groups=10, days=6, fill_rate=0.6, seed=0, stream_rate=0.0):
+    """Возвращает байты XLS файла с расписанием groups групп на days дней"""
+    rnd = random.Random(seed)
+    workbook = xlwt.Workbook(encoding='utf-8')
+    sheet = workbook.add_sheet('Расписание')
+
+    sheet.write(0, 0, "Расписание занятий")
+    sheet.write(1, 0, "День")
+    sheet.write(1, 1, "Пара")
+    for col_idx, name in enumerate(group_names(groups), start=2):
+        sheet.write(1, col_idx, name)
+
+    row_idx = 2
+    for day in range(days):
+        for lesson_number in range(1, LESSONS_PER_DAY + 1):
+            if lesson_number == 1:
+                sheet.write(row_idx, 0, SHEET_DAYS[day % len(SHEET_DAYS)])
+            sheet.write(row_idx, 1, str(lesson_number))
+            col_idx = 2
+            while col_idx < groups + 2:
+                if stream_rate and rnd.random() < stream_rate:
+                    last_col = min(col_idx + rnd.randint(*STREAM_WIDTH), groups + 2) - 1
+                    cell = f"{rnd.choice(SUBJECTS)} (Лекционные) {rnd.choice(TEACHERS)} {rnd.choice(ROOMS)}"
+                    sheet.write_merge(row_idx, row_idx, col_idx, last_col, cell)
+                    col_idx = last_col + 1
+                    continue
+                if rnd.random() < fill_rate:
+                    sheet.write(row_idx, col_idx, lesson_cell(rnd))
+                col_idx += 1
+            row_idx += 1
+
+    buffer = io.BytesIO()
+    workbook.save(buffer)
+    return buffer.getvalue()
+
+def generate_schedule_page(institutes=30, courses=6, revisions=5):
+    """HTML страница расписания: разделы институтов со ссылками на XLS.
+
+    Раздел ИТКН стоит в середине страницы, как на misis.ru.
+    """
+    names = [f"Институт {i + 1}" for i in range(institutes)]
+    names.insert(institutes // 2, "Институт компьютерных наук")
+    parts = ['<html><head><meta charset="utf-8"></head><body>']
+    for index, name in enumerate(names):
+        parts.append(f'<div class="block"><h2>{name}</h2><ul>')
+        for course in range(1, courses + 1):
+            for revision in range(revisions):
+                parts.append(f'<li><a href="/files/inst{index}_{course}_{revision + 1:02d}0925.xls">'
+                             f'{course} курс, редакция {revision + 1}</a> <a href="/files/inst{index}.pdf">PDF</a></li>')
+        parts.append('</ul></div>')
+    parts.append('</body></html>')
+    return ''.join(parts).encode('utf-8')
+
+def main():
+    parser = argparse.ArgumentParser(description="Генерация синтетического XLS расписания")
+    parser.add_argument('output', help="путь к создаваемому XLS файлу")
+    parser.add_argument('--groups', type=int, default=10)
+    parser.add_argument('--days', type=int, default=6)
+    parser.add_argument('--fill-rate', type=float, default=0.6)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--stream-rate', type=float, default=0.0,
+                        help="доля пар, которые становятся лекциями потока (объединенные ячейки)")
+    args = parser.parse_args()
+
+    with open(args.output, 'wb') as f:
+        f.write(generate_workbook(args.groups, args.days, args.fill_rate, args.seed, args.stream_rate))
+
+if __name__ == "__main__":
+    main()
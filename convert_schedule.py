@@ -1,16 +1,16 @@
 import requests
-from bs4 import BeautifulSoup
-import re
-from urllib.parse import urljoin
-import openpyxl
-from io import BytesIO
 from ics import Calendar, Event
 import pytz
 from datetime import datetime, timedelta
 import os
+import sys
 import telegram
 import hashlib
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'scripts'))
+from workbook_reader import iter_sheet_rows
+from link_discovery import find_schedule_links
+
 # Конфигурация
 GROUP_NAME = "ББИ-25-2"
 START_DATE = datetime(2025, 9, 1)  # 01.09.2025
@@ -23,20 +23,12 @@ def get_latest_schedule_url():
         response = requests.get(url, timeout=10)
         response.raise_for_status()
         
-        soup = BeautifulSoup(response.content, 'html.parser')
-        
-        # Ищем блок с Институтом компьютерных наук
-        itkn_blocks = soup.find_all(string=re.compile(r'Институт компьютерных наук', re.IGNORECASE))
-        
-        for block in itkn_blocks:
-            parent = block.find_parent()
-            # Ищем ссылки на XLS файлы в этом блоке
-            xls_links = parent.find_all('a', href=re.compile(r'\.xls$'))
-            
-            if xls_links:
+        # Разбор останавливается после раздела Института компьютерных наук
+        links = find_schedule_links(response.content, url, institute='Институт компьютерных наук')
+        for link in links:
+            if link.institute and 'компьютерных наук' in link.institute.lower():
                 # Берем первую (последнюю) ссылку
-                xls_link = xls_links[0]
-                return urljoin(url, xls_link['href'])
+                return link.url
         
         return None
         
@@ -57,16 +49,12 @@ def download_schedule_file(url):
 def parse_xls_schedule(xls_content, group_name):
     """Парсит XLS файл и извлекает расписание для указанной группы"""
     try:
-        # Загружаем Excel файл из памяти
-        workbook = openpyxl.load_workbook(BytesIO(xls_content))
-        sheet = workbook.active
-        
         schedule_data = []
         current_date = None
         current_day = None
         
         # Проходим по всем строкам
-        for row in sheet.iter_rows(values_only=True):
+        for row in iter_sheet_rows(xls_content):
             # Пропускаем пустые строки
             if not any(row):
                 continue
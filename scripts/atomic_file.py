@@ -0,0 +1,17 @@
+"""Атомарная запись файлов.
+
+Содержимое пишется во временный файл рядом с целевым и подменяет его
+через os.replace, поэтому прерванный запуск не оставляет обрезанный
+кеш, состояние или календарь: читатель видит либо старый файл, либо новый.
+"""
+import os
+
+def write_atomic(path, data):
+    """Пишет data (bytes или str в UTF-8) в path через временный файл и os.replace"""
+    if isinstance(data, str):
+        data = data.encode('utf-8')
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, path)
@@ -0,0 +1,182 @@
+"""Вывод календарей отдельными файлами по группам, преподавателям и аудиториям.
+
+    calendars/
+      groups/<группа>.ics
+      teachers/<преподаватель>.ics   (--teacher-calendars)
+      rooms/<аудитория>.ics          (--room-calendars)
+      manifest.json
+
+Календари отрисовываются в пуле процессов. manifest.json хранит для
+каждого календаря файл, SHA-256 содержимого, отпечаток исходных данных
+(занятий и календаря семестра) и число событий. Календарь с тем же
+отпечатком не отрисовывается заново, а файл с неизменившимся хешем не
+перезаписывается, поэтому новая редакция расписания обходится
+отрисовкой и записью только изменившихся календарей.
+"""
+import hashlib
+import json
+import os
+import re
+
+from atomic_file import write_atomic
+from ics_writer import iter_calendar_lines, iter_combined_calendar_lines
+from lesson_model import LESSON_FIELDS
+from metrics import span
+from occupancy import UNKNOWN_VALUES
+from schedule_diff import save_json
+
+OUTPUT_DIR = 'calendars'
+MANIFEST_NAME = 'manifest.json'
+MANIFEST_VERSION = 1
+# Версия отрисовки: увеличивается при изменении формата календарей,
+# чтобы календари с прежними исходными данными отрисовались заново
+RENDER_VERSION = 1
+
+# Заголовок и описание календаря для каждого вида
+CALENDAR_TITLES = {
+    "teachers": ("Расписание: {name}", "Занятия преподавателя {name}"),
+    "rooms": ("Аудитория {name}", "Занятия в аудитории {name}"),
+}
+
+UNSAFE_FILENAME_CHARS = re.compile(r'[\\/:*?"<>|\s]+')
+
+def safe_filename(name):
+    """Имя файла без разделителей путей и пробелов"""
+    return UNSAFE_FILENAME_CHARS.sub('_', name).strip('._') or '_'
+
+def shared_entries(lessons_by_group, attribute):
+    """Занятия по значению атрибута (teacher или location) во всех группах.
+
+    Занятие потока встречается в нескольких группах, в календаре оно
+    становится одним событием со списком групп. Возвращает
+    «значение → [(группы, занятие)]», отсортированные по дню и паре.
+    """
+    merged = {}
+    for group, lessons in lessons_by_group.items():
+        for lesson in lessons:
+            name = getattr(lesson, attribute)
+            if name in UNKNOWN_VALUES:
+                continue
+            key = (lesson.day, lesson.slot, lesson.week, lesson.subject, lesson.type, lesson.teacher, lesson.location)
+            _, groups = merged.setdefault(name, {}).setdefault(key, (lesson, []))
+            groups.append(group)
+
+    return {name: [(', '.join(groups), lesson)
+                   for lesson, groups in sorted(items.values(), key=lambda item: (item[0].day, item[0].slot, item[0].week))]
+            for name, items in merged.items()}
+
+def build_jobs(lessons_by_group, teachers=False, rooms=False):
+    """Список (вид, имя, [(группы, занятие)]) для отрисовки"""
+    jobs = [("groups", group, [(group, lesson) for lesson in lessons])
+            for group, lessons in lessons_by_group.items()]
+    if teachers:
+        jobs.extend(("teachers", name, entries)
+                    for name, entries in shared_entries(lessons_by_group, "teacher").items())
+    if rooms:
+        jobs.extend(("rooms", name, entries)
+                    for name, entries in shared_entries(lessons_by_group, "location").items())
+    return jobs
+
+def source_fingerprint(kind, name, entries, semester):
+    """SHA-256 исходных данных календаря: от него зависит содержимое файла"""
+    digest = hashlib.sha256(f"{RENDER_VERSION}|{semester.fingerprint()}|{kind}|{name}".encode('utf-8'))
+    for groups, lesson in entries:
+        values = (groups,) + tuple(getattr(lesson, field) for field in LESSON_FIELDS)
+        digest.update(repr(values).encode('utf-8'))
+    return digest.hexdigest()
+
+def render_calendar(job):
+    """Отрисовывает один календарь в дочернем процессе.
+
+    Если хеш совпал с known_hash, содержимое не возвращается, чтобы не
+    передавать его обратно между процессами.
+    """
+    kind, name, entries, semester, known_hash = job
+    if kind == "groups":
+        lines = iter_calendar_lines([lesson for _, lesson in entries], name, semester)
+    else:
+        title, description = CALENDAR_TITLES[kind]
+        lines = iter_combined_calendar_lines(entries, title.format(name=name), description.format(name=name),
+                                             semester, uid_prefix=f"{kind}/")
+    content = ''.join(lines).encode('utf-8')
+    digest = hashlib.sha256(content).hexdigest()
+    return kind, name, (None if digest == known_hash else content), digest, len(entries)
+
+def load_manifest(output_dir=OUTPUT_DIR):
+    try:
+        with open(os.path.join(output_dir, MANIFEST_NAME), 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if manifest.get("version") != MANIFEST_VERSION:
+        return None
+    return manifest
+
+def _render_all(jobs, processes):
+    if len(jobs) > 1 and processes != 1:
+        from concurrent.futures import ProcessPoolExecutor
+
+        workers = min(processes or os.cpu_count() or 1, len(jobs))
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            return list(executor.map(render_calendar, jobs, chunksize=max(1, len(jobs) // (workers * 4))))
+    return [render_calendar(job) for job in jobs]
+
+def write_calendars(lessons_by_group, semester, output_dir=OUTPUT_DIR,
+                    teachers=False, rooms=False, processes=None):
+    """Отрисовывает и записывает календари, обновляет manifest.json.
+
+    Возвращает словарь со счетчиками written, unchanged и removed.
+    """
+    old_manifest = load_manifest(output_dir) or {"calendars": {}}
+    old_calendars = old_manifest["calendars"]
+
+    jobs = []
+    sources = {}
+    results = []
+    for kind, name, entries in build_jobs(lessons_by_group, teachers, rooms):
+        source = sources[kind, name] = source_fingerprint(kind, name, entries, semester)
+        old_entry = old_calendars.get(kind, {}).get(name)
+        known_hash = None
+        # Хеш из манифеста верен, только если сам файл на месте
+        if old_entry and os.path.exists(os.path.join(output_dir, old_entry["file"])):
+            known_hash = old_entry["sha256"]
+            if old_entry.get("source") == source:
+                # Исходные данные те же: календарь не отрисовывается
+                results.append((kind, name, None, known_hash, old_entry["events"]))
+                continue
+        jobs.append((kind, name, entries, semester, known_hash))
+
+    with span("calendar_render", items=len(jobs)) as record:
+        results.extend(_render_all(jobs, processes))
+        record["reused"] = len(results) - len(jobs)
+
+    stats = {"written": 0, "unchanged": 0, "removed": 0}
+    calendars = {}
+    with span("calendar_write") as record:
+        for kind, name, content, digest, events in results:
+            relative_path = f"{kind}/{safe_filename(name)}.ics"
+            calendars.setdefault(kind, {})[name] = {"file": relative_path, "sha256": digest,
+                                                     "source": sources[kind, name], "events": events}
+            if content is None:
+                stats["unchanged"] += 1
+                continue
+            write_atomic(os.path.join(output_dir, relative_path), content)
+            stats["written"] += 1
+
+        # Календари групп, преподавателей и аудиторий, которых больше нет
+        current_files = {entry["file"] for entries in calendars.values() for entry in entries.values()}
+        for entries in old_calendars.values():
+            for entry in entries.values():
+                if entry["file"] not in current_files:
+                    try:
+                        os.remove(os.path.join(output_dir, entry["file"]))
+                        stats["removed"] += 1
+                    except OSError:
+                        pass
+        record["items"] = stats["written"]
+
+    manifest = {"version": MANIFEST_VERSION, "calendars": calendars}
+    if manifest != old_manifest:
+        os.makedirs(output_dir, exist_ok=True)
+        save_json(os.path.join(output_dir, MANIFEST_NAME), manifest)
+    return stats
@@ -0,0 +1,74 @@
+"""Параллельное скачивание нескольких файлов расписания.
+
+Файлы качаются пулом потоков через общую сессию из http_cache,
+число одновременных запросов к одному хосту ограничено, а сбойные
+запросы повторяются с экспоненциальной задержкой.
+"""
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
+
+from http_cache import cached_get
+
+MAX_WORKERS = 8
+MAX_PER_HOST = 4
+MAX_RETRIES = 3
+BACKOFF_BASE = 1.0  # секунды
+
+_host_limits = {}
+_host_limits_lock = threading.Lock()
+
+def _host_semaphore(url, per_host):
+    host = urlparse(url).netloc
+    with _host_limits_lock:
+        semaphore = _host_limits.get(host)
+        if semaphore is None:
+            semaphore = threading.BoundedSemaphore(per_host)
+            _host_limits[host] = semaphore
+        return semaphore
+
+def _is_retryable(error):
+    import requests
+
+    if isinstance(error, requests.HTTPError) and error.response is not None:
+        status = error.response.status_code
+        return status == 429 or status >= 500
+    return isinstance(error, (requests.ConnectionError, requests.Timeout))
+
+def fetch_with_retry(url, timeout=30, retries=MAX_RETRIES, per_host=MAX_PER_HOST):
+    """Скачивает файл с повторами и возвращает (содержимое, изменился ли)"""
+    semaphore = _host_semaphore(url, per_host)
+    for attempt in range(retries + 1):
+        try:
+            with semaphore:
+                return cached_get(url, timeout=timeout)
+        except Exception as e:
+            if attempt == retries or not _is_retryable(e):
+                raise
+            # Экспоненциальная задержка со случайной добавкой
+            delay = BACKOFF_BASE * (2 ** attempt)
+            time.sleep(delay + random.uniform(0, delay / 2))
+
+def fetch_all(urls, max_workers=MAX_WORKERS, per_host=MAX_PER_HOST, timeout=30):
+    """Скачивает все файлы параллельно.
+
+    Возвращает словарь «url → (содержимое, изменился ли)»; для файлов,
+    которые так и не удалось скачать, значение равно None.
+    """
+    urls = list(dict.fromkeys(urls))
+    results = {}
+    if not urls:
+        return results
+
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(urls))) as executor:
+        futures = {url: executor.submit(fetch_with_retry, url, timeout, MAX_RETRIES, per_host)
+                   for url in urls}
+        for url, future in futures.items():
+            try:
+                results[url] = future.result()
+            except Exception:
+                results[url] = None
+
+    return results
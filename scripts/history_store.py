@@ -0,0 +1,234 @@
+"""История разобранных расписаний в локальной базе SQLite.
+
+После каждого парсинга main() записывает ревизию файла со всеми группами
+и занятиями, поэтому на вопросы вида «что было у группы во вторник
+в ревизии X» можно ответить из базы, не скачивая и не разбирая XLS.
+
+База лежит в history/ (SCHEDULE_HISTORY_DIR), а не в .cache: в CI каталог
+.cache живет только в actions/cache, который GitHub удаляет после 7 дней
+без обращений, поэтому при еженедельном запуске история пропадала бы.
+Workflow коммитит history/ вместе с календарями.
+
+    python scripts/history_store.py revisions
+    python scripts/history_store.py lessons --group ББИ-25-2 --day вт --revision 3
+"""
+import argparse
+import os
+import shutil
+import sqlite3
+from datetime import datetime
+
+from http_cache import CACHE_ROOT
+from lesson_model import DAY_NAMES, LESSON_TIMES, Lesson, day_name
+
+HISTORY_DIR = os.getenv('SCHEDULE_HISTORY_DIR', 'history')
+DB_PATH = os.path.join(HISTORY_DIR, 'schedule_history.sqlite3')
+# Прежнее место базы: переносится в DB_PATH при первом подключении
+LEGACY_DB_PATH = os.path.join(CACHE_ROOT, 'schedule_history.sqlite3')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS revisions (
+    id INTEGER PRIMARY KEY,
+    source_url TEXT,
+    content_hash TEXT NOT NULL,
+    parser_version INTEGER NOT NULL,
+    created_at TEXT NOT NULL,
+    last_seen INTEGER NOT NULL DEFAULT 0,
+    UNIQUE (content_hash, parser_version)
+);
+CREATE TABLE IF NOT EXISTS groups (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE
+);
+CREATE TABLE IF NOT EXISTS lessons (
+    revision_id INTEGER NOT NULL REFERENCES revisions(id),
+    group_id INTEGER NOT NULL REFERENCES groups(id),
+    day INTEGER NOT NULL,
+    slot INTEGER NOT NULL,
+    week INTEGER NOT NULL DEFAULT 0,
+    subject TEXT NOT NULL,
+    type TEXT NOT NULL,
+    teacher TEXT NOT NULL,
+    location TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS lessons_group_idx ON lessons (group_id, revision_id, day, slot);
+CREATE INDEX IF NOT EXISTS lessons_slot_idx ON lessons (revision_id, day, slot);
+CREATE INDEX IF NOT EXISTS lessons_teacher_idx ON lessons (teacher, revision_id);
+CREATE INDEX IF NOT EXISTS lessons_location_idx ON lessons (location, revision_id);
+"""
+
+def connect(db_path=DB_PATH, create=True):
+    """Открывает базу и создает схему при первом подключении.
+
+    С create=False отсутствующая база не создается пустой, а вызывает
+    FileNotFoundError — так читатели истории не принимают пропавшую базу
+    за историю без ревизий.
+    """
+    if not os.path.exists(db_path):
+        if not create and not (db_path == DB_PATH and os.path.exists(LEGACY_DB_PATH)):
+            raise FileNotFoundError(f"База истории не найдена: {db_path}")
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        if db_path == DB_PATH and os.path.exists(LEGACY_DB_PATH):
+            shutil.move(LEGACY_DB_PATH, db_path)
+    connection = sqlite3.connect(db_path)
+    connection.row_factory = sqlite3.Row
+    connection.executescript(SCHEMA)
+    columns = {row["name"] for row in connection.execute("PRAGMA table_info(lessons)")}
+    if "week" not in columns:
+        # База создана до появления четности недель
+        connection.execute("ALTER TABLE lessons ADD COLUMN week INTEGER NOT NULL DEFAULT 0")
+    columns = {row["name"] for row in connection.execute("PRAGMA table_info(revisions)")}
+    if "last_seen" not in columns:
+        # База создана до учета повторно встреченных файлов: порядок по id
+        with connection:
+            connection.execute("ALTER TABLE revisions ADD COLUMN last_seen INTEGER NOT NULL DEFAULT 0")
+            connection.execute("UPDATE revisions SET last_seen = id")
+    return connection
+
+def _next_seen(connection):
+    return connection.execute("SELECT COALESCE(MAX(last_seen), 0) + 1 FROM revisions").fetchone()[0]
+
+def record_revision(connection, lessons_by_group, content_hash, parser_version, source_url=None):
+    """Записывает ревизию одной транзакцией и возвращает ее id.
+
+    Если такой файл уже был записан той же версией парсера,
+    возвращается id существующей ревизии, и она снова становится
+    текущей (например, когда на сайте откатили файл).
+    """
+    row = connection.execute(
+        "SELECT id FROM revisions WHERE content_hash = ? AND parser_version = ?",
+        (content_hash, parser_version)).fetchone()
+    if row:
+        with connection:
+            connection.execute("UPDATE revisions SET last_seen = ? WHERE id = ?",
+                               (_next_seen(connection), row["id"]))
+        return row["id"]
+
+    with connection:
+        cursor = connection.execute(
+            "INSERT INTO revisions (source_url, content_hash, parser_version, created_at, last_seen) "
+            "VALUES (?, ?, ?, ?, ?)",
+            (source_url, content_hash, parser_version, datetime.now().isoformat(timespec='seconds'),
+             _next_seen(connection)))
+        revision_id = cursor.lastrowid
+
+        connection.executemany("INSERT OR IGNORE INTO groups (name) VALUES (?)",
+                               [(group,) for group in lessons_by_group])
+        group_ids = dict(connection.execute("SELECT name, id FROM groups"))
+
+        connection.executemany(
+            "INSERT INTO lessons (revision_id, group_id, day, slot, week, subject, type, teacher, location) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            [(revision_id, group_ids[group], lesson.day, lesson.slot, lesson.week, lesson.subject,
+              lesson.type, lesson.teacher, lesson.location)
+             for group, lessons in lessons_by_group.items() for lesson in lessons])
+
+    return revision_id
+
+def list_revisions(connection):
+    return connection.execute(
+        "SELECT r.id, r.source_url, r.content_hash, r.parser_version, r.created_at, "
+        "(SELECT COUNT(*) FROM lessons l WHERE l.revision_id = r.id) AS lessons_count "
+        "FROM revisions r ORDER BY r.id").fetchall()
+
+def latest_revision_id(connection):
+    """Текущая ревизия — встреченная последней, а не записанная последней"""
+    row = connection.execute("SELECT id FROM revisions ORDER BY last_seen DESC, id DESC LIMIT 1").fetchone()
+    return row["id"] if row else None
+
+def query_lessons(connection, group=None, day=None, slot=None, teacher=None, location=None, revision_id=None):
+    """Возвращает занятия по фильтрам; по умолчанию из последней ревизии"""
+    if revision_id is None:
+        revision_id = latest_revision_id(connection)
+
+    conditions = ["l.revision_id = ?"]
+    params = [revision_id]
+    if group is not None:
+        conditions.append("g.name = ?")
+        params.append(group)
+    if day is not None:
+        conditions.append("l.day = ?")
+        params.append(day)
+    if slot is not None:
+        conditions.append("l.slot = ?")
+        params.append(slot)
+    if teacher is not None:
+        conditions.append("l.teacher = ?")
+        params.append(teacher)
+    if location is not None:
+        conditions.append("l.location = ?")
+        params.append(location)
+
+    return connection.execute(
+        "SELECT g.name AS group_name, l.day, l.slot, l.week, l.subject, l.type, l.teacher, l.location "
+        "FROM lessons l JOIN groups g ON g.id = l.group_id "
+        f"WHERE {' AND '.join(conditions)} ORDER BY g.name, l.day, l.slot",
+        params).fetchall()
+
+def load_lessons_by_group(connection, revision_id=None):
+    """Восстанавливает словарь «группа → занятия» для ревизии"""
+    lessons_by_group = {}
+    for row in query_lessons(connection, revision_id=revision_id):
+        lessons_by_group.setdefault(row["group_name"], []).append(Lesson(
+            row["subject"], row["day"], row["slot"],
+            location=row["location"], teacher=row["teacher"], type=row["type"], week=row["week"]))
+    return lessons_by_group
+
+def parse_day(value):
+    """Принимает номер дня (1 — понедельник) или его название/сокращение"""
+    if value is None:
+        return None
+    if value.isdigit():
+        if not 1 <= int(value) <= len(DAY_NAMES):
+            raise argparse.ArgumentTypeError(f"номер дня должен быть от 1 до {len(DAY_NAMES)}: {value}")
+        return int(value) - 1
+    value = value.lower()
+    for index, name in enumerate(DAY_NAMES):
+        if name.lower().startswith(value):
+            return index
+    raise argparse.ArgumentTypeError(f"неизвестный день недели: {value}")
+
+def parse_slot(value):
+    """Номер пары из LESSON_TIMES"""
+    if not value.isdigit() or int(value) not in LESSON_TIMES:
+        raise argparse.ArgumentTypeError(
+            f"номер пары должен быть от {min(LESSON_TIMES)} до {max(LESSON_TIMES)}: {value}")
+    return int(value)
+
+def main():
+    parser = argparse.ArgumentParser(description="История расписаний МИСИС")
+    parser.add_argument('--db', default=DB_PATH, help="путь к базе SQLite")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    commands.add_parser('revisions', help="список сохраненных ревизий")
+
+    lessons_parser = commands.add_parser('lessons', help="занятия по фильтрам")
+    lessons_parser.add_argument('--group')
+    lessons_parser.add_argument('--day', type=parse_day, help="1–7 или название, например «вт»")
+    lessons_parser.add_argument('--slot', type=parse_slot)
+    lessons_parser.add_argument('--teacher')
+    lessons_parser.add_argument('--location')
+    lessons_parser.add_argument('--revision', type=int, help="id ревизии (по умолчанию последняя)")
+
+    args = parser.parse_args()
+    try:
+        connection = connect(args.db, create=False)
+    except FileNotFoundError as e:
+        parser.error(str(e))
+
+    if args.command == 'revisions':
+        for row in list_revisions(connection):
+            print(f"{row['id']:>4}  {row['created_at']}  v{row['parser_version']}  "
+                  f"{row['lessons_count']:>6} занятий  {row['source_url'] or ''}")
+        return
+
+    rows = query_lessons(connection, group=args.group, day=args.day, slot=args.slot,
+                         teacher=args.teacher, location=args.location, revision_id=args.revision)
+    for row in rows:
+        print(f"{row['group_name']}  {day_name(row['day'])}, {row['slot']} пара: {row['subject']} "
+              f"({row['type']}) — {row['teacher']}, {row['location']}")
+
+if __name__ == "__main__":
+    main()
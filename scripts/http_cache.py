@@ -0,0 +1,128 @@
+"""HTTP-кеш с условными запросами (ETag / Last-Modified).
+
+Тела ответов хранятся на диске вместе с валидаторами, поэтому повторный
+запрос отправляет If-None-Match / If-Modified-Since и при ответе 304
+берет данные из кеша, не скачивая их заново.
+"""
+import hashlib
+import json
+import os
+
+from atomic_file import write_atomic
+
+CACHE_ROOT = os.getenv('SCHEDULE_CACHE_DIR', '.cache')
+HTTP_CACHE_DIR = os.path.join(CACHE_ROOT, 'http')
+
+USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+
+_session = None
+
+def get_session():
+    """Возвращает общую сессию requests с пулом соединений"""
+    global _session
+    if _session is None:
+        import requests
+        from requests.adapters import HTTPAdapter
+
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=16)
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        session.headers['User-Agent'] = USER_AGENT
+        _session = session
+    return _session
+
+def _cache_paths(url):
+    key = hashlib.sha256(url.encode()).hexdigest()
+    base = os.path.join(HTTP_CACHE_DIR, key)
+    return base + '.body', base + '.json'
+
+def load_cached_response(url):
+    """Возвращает (валидаторы, тело) из кеша или (None, None)"""
+    body_path, meta_path = _cache_paths(url)
+    try:
+        with open(meta_path, 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+        with open(body_path, 'rb') as f:
+            body = f.read()
+        return meta, body
+    except (OSError, ValueError):
+        return None, None
+
+def store_response(url, response):
+    """Сохраняет тело ответа и его валидаторы в кеш"""
+    body_path, meta_path = _cache_paths(url)
+    meta = {
+        'url': url,
+        'etag': response.headers.get('ETag'),
+        'last_modified': response.headers.get('Last-Modified'),
+    }
+    write_atomic(body_path, response.content)
+    write_atomic(meta_path, json.dumps(meta, ensure_ascii=False))
+
+def conditional_headers(meta):
+    """Заголовки условного запроса по сохраненным валидаторам"""
+    headers = {}
+    if meta:
+        if meta.get('etag'):
+            headers['If-None-Match'] = meta['etag']
+        if meta.get('last_modified'):
+            headers['If-Modified-Since'] = meta['last_modified']
+    return headers
+
+def conditional_request(url, method='HEAD', timeout=10):
+    """Легкий условный запрос через urllib без импорта requests.
+
+    Возвращает (код ответа, заголовки, тело). Тело читается только
+    для GET с ответом 200; валидаторы берутся из кеша.
+    """
+    from urllib.error import HTTPError
+    from urllib.request import Request, urlopen
+
+    meta, cached_body = load_cached_response(url)
+    headers = {'User-Agent': USER_AGENT}
+    if cached_body is not None:
+        headers.update(conditional_headers(meta))
+
+    request = Request(url, headers=headers, method=method)
+    try:
+        with urlopen(request, timeout=timeout) as response:
+            body = response.read() if method == 'GET' else b''
+            return response.status, response.headers, body
+    except HTTPError as e:
+        if e.code == 304:
+            return 304, e.headers, b''
+        raise
+
+def session_conditional_request(url, method='HEAD', timeout=10):
+    """Условный запрос через общую сессию requests (get_session).
+
+    Для частых проверок в режиме --watch: соединение с сервером
+    переиспользуется между циклами. Возвращает объект ответа requests;
+    ответ 304 ошибкой не считается. Кеш не меняется, сохранить тело можно
+    через store_response.
+    """
+    meta, cached_body = load_cached_response(url)
+    headers = conditional_headers(meta) if cached_body is not None else {}
+    response = get_session().request(method, url, headers=headers, timeout=timeout)
+    if response.status_code != 304:
+        response.raise_for_status()
+    return response
+
+def cached_get(url, timeout=10):
+    """Выполняет условный GET и возвращает (содержимое, изменилось ли).
+
+    При ответе 304 содержимое берется из кеша. Если сервер не поддерживает
+    валидаторы, изменение определяется сравнением с сохраненным телом.
+    """
+    meta, cached_body = load_cached_response(url)
+    headers = conditional_headers(meta) if cached_body is not None else {}
+
+    response = get_session().get(url, timeout=timeout, headers=headers)
+    if response.status_code == 304 and cached_body is not None:
+        return cached_body, False
+    response.raise_for_status()
+
+    modified = response.content != cached_body
+    store_response(url, response)
+    return response.content, modified
@@ -0,0 +1,200 @@
+"""HTTP-сервер подписок на календари групп.
+
+Отдает /groups/<группа>.ics из заранее отрисованных тел, которые лежат
+в памяти в обычном и сжатом gzip виде. У каждого тела строгий ETag,
+поэтому календарные клиенты при повторном опросе получают 304 без тела.
+Сервер построен на asyncio и держит тысячи keep-alive соединений в
+одном потоке.
+
+Календари строятся из последней ревизии истории (history_store). Сервер
+периодически проверяет, не появилась ли новая ревизия, отрисовывает ее
+в отдельном потоке и подменяет весь набор тел одной операцией, так что
+клиент никогда не увидит смесь старых и новых календарей.
+
+    python scripts/ics_server.py --port 8080
+    curl --compressed http://localhost:8080/groups/ББИ-25-2.ics
+"""
+import argparse
+import asyncio
+import gzip
+import hashlib
+import signal
+from urllib.parse import unquote, urlsplit
+
+import history_store
+
+RELOAD_INTERVAL = 30   # секунд между проверками новой ревизии
+IDLE_TIMEOUT = 60      # секунд простоя keep-alive соединения
+MAX_HEADERS = 100
+CACHE_CONTROL = 'max-age=300'
+CONTENT_TYPE = 'text/calendar; charset=utf-8'
+
+class CalendarBody:
+    """Отрисованный календарь: тело, его gzip-версия и ETag"""
+
+    __slots__ = ('plain', 'compressed', 'etag', 'gzip_etag')
+
+    def __init__(self, plain):
+        digest = hashlib.sha256(plain).hexdigest()[:32]
+        self.plain = plain
+        self.compressed = gzip.compress(plain, compresslevel=9, mtime=0)
+        # Разные представления одного ресурса получают разные строгие ETag
+        self.etag = f'"{digest}"'
+        self.gzip_etag = f'"{digest}-gz"'
+
+def render_calendars(lessons_by_group):
+    """Отрисовывает календари всех групп: «группа → CalendarBody»"""
+    from ics_writer import iter_calendar_lines
+    from schedule_parser import SEMESTER
+
+    return {group: CalendarBody(''.join(iter_calendar_lines(lessons, group, SEMESTER)).encode('utf-8'))
+            for group, lessons in lessons_by_group.items()}
+
+class CalendarStore:
+    """Текущий набор календарей; подменяется целиком при новой ревизии"""
+
+    def __init__(self, db_path=history_store.DB_PATH):
+        self.db_path = db_path
+        self.revision_id = None
+        self.calendars = {}
+
+    def reload(self):
+        """Перечитывает историю; возвращает True, если календари обновились"""
+        connection = history_store.connect(self.db_path, create=False)
+        try:
+            revision_id = history_store.latest_revision_id(connection)
+            if revision_id is None or revision_id == self.revision_id:
+                return False
+            lessons_by_group = history_store.load_lessons_by_group(connection, revision_id)
+        finally:
+            connection.close()
+
+        calendars = render_calendars(lessons_by_group)
+        # Одна операция присваивания: обработчики видят либо старый, либо новый набор
+        self.calendars = calendars
+        self.revision_id = revision_id
+        return True
+
+def _etag_matches(if_none_match, body):
+    if if_none_match.strip() == '*':
+        return True
+    tags = {tag.strip() for tag in if_none_match.split(',')}
+    return body.etag in tags or body.gzip_etag in tags
+
+def respond(store, method, target, headers):
+    """Возвращает (код, заголовки, тело) ответа на запрос"""
+    if method not in ('GET', 'HEAD'):
+        return 405, {'Allow': 'GET, HEAD'}, b''
+
+    path = unquote(urlsplit(target).path)
+    if not (path.startswith('/groups/') and path.endswith('.ics')):
+        return 404, {}, b''
+    body = store.calendars.get(path[len('/groups/'):-len('.ics')])
+    if body is None:
+        return 404, {}, b''
+
+    use_gzip = 'gzip' in headers.get('accept-encoding', '')
+    response_headers = {
+        'Content-Type': CONTENT_TYPE,
+        'Cache-Control': CACHE_CONTROL,
+        'Vary': 'Accept-Encoding',
+        'ETag': body.gzip_etag if use_gzip else body.etag,
+    }
+    if _etag_matches(headers.get('if-none-match', ''), body):
+        return 304, response_headers, b''
+
+    if use_gzip:
+        response_headers['Content-Encoding'] = 'gzip'
+        return 200, response_headers, body.compressed
+    return 200, response_headers, body.plain
+
+REASONS = {200: 'OK', 304: 'Not Modified', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed'}
+
+def format_response(status, headers, body, method, keep_alive):
+    lines = [f'HTTP/1.1 {status} {REASONS[status]}']
+    lines.extend(f'{name}: {value}' for name, value in headers.items())
+    if status != 304:
+        lines.append(f'Content-Length: {len(body)}')
+    lines.append('Connection: keep-alive' if keep_alive else 'Connection: close')
+    head = ('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1')
+    return head if method == 'HEAD' or status == 304 else head + body
+
+async def read_request(reader):
+    """Читает строку запроса и заголовки; None, если клиент закрыл соединение"""
+    request_line = await asyncio.wait_for(reader.readline(), IDLE_TIMEOUT)
+    if not request_line:
+        return None
+    parts = request_line.decode('latin-1').split()
+    if len(parts) != 3:
+        raise ValueError("некорректная строка запроса")
+
+    headers = {}
+    for _ in range(MAX_HEADERS):
+        line = await asyncio.wait_for(reader.readline(), IDLE_TIMEOUT)
+        if line in (b'\r\n', b'\n', b''):
+            return parts, headers
+        name, _, value = line.decode('latin-1').partition(':')
+        headers[name.strip().lower()] = value.strip()
+    raise ValueError("слишком много заголовков")
+
+async def handle_client(store, reader, writer):
+    try:
+        while True:
+            try:
+                request = await read_request(reader)
+            except ValueError:
+                writer.write(format_response(400, {}, b'', 'GET', False))
+                break
+            if request is None:
+                break
+
+            (method, target, version), headers = request
+            keep_alive = version == 'HTTP/1.1' and headers.get('connection', '').lower() != 'close'
+            status, response_headers, body = respond(store, method, target, headers)
+            writer.write(format_response(status, response_headers, body, method, keep_alive))
+            await writer.drain()
+            if not keep_alive:
+                break
+    except (asyncio.TimeoutError, ConnectionError):
+        pass
+    finally:
+        writer.close()
+
+async def reload_periodically(store, interval):
+    loop = asyncio.get_running_loop()
+    while True:
+        try:
+            # Отрисовка идет в отдельном потоке, чтобы не останавливать обработку запросов
+            if await loop.run_in_executor(None, store.reload):
+                print(f"✅ Ревизия {store.revision_id}: {len(store.calendars)} календарей")
+        except Exception as e:
+            print(f"❌ Ошибка при обновлении календарей: {e}")
+        await asyncio.sleep(interval)
+
+async def serve(store, host, port, reload_interval=RELOAD_INTERVAL):
+    """Запускает сервер и работает до SIGTERM/SIGINT"""
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for signum in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(signum, stop.set)
+
+    server = await asyncio.start_server(lambda r, w: handle_client(store, r, w), host, port)
+    reloader = asyncio.create_task(reload_periodically(store, reload_interval))
+    print(f"🌐 Календари доступны на http://{host}:{port}/groups/<группа>.ics")
+    async with server:
+        await stop.wait()
+    reloader.cancel()
+
+def main():
+    parser = argparse.ArgumentParser(description="Сервер подписок на календари групп")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--db', default=history_store.DB_PATH, help="путь к базе истории")
+    parser.add_argument('--reload-interval', type=float, default=RELOAD_INTERVAL,
+                        help="секунд между проверками новой ревизии")
+    args = parser.parse_args()
+
+    asyncio.run(serve(CalendarStore(args.db), args.host, args.port, args.reload_interval))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,173 @@
+"""Потоковая запись iCalendar (RFC 5545) без промежуточного объекта календаря.
+
+Строки календаря выдаются генератором и сразу пишутся в файл, а UID
+каждого события вычисляется из группы, дня, пары и предмета, поэтому
+повторная генерация того же расписания дает тот же самый файл.
+Даты занятий берутся из календаря семестра (semester.Semester): каждое
+занятие — одно правило RRULE с EXDATE для праздников и RDATE для переносов.
+"""
+import hashlib
+from datetime import datetime, time
+
+from lesson_model import WEEK_EVEN, WEEK_ODD, is_valid_slot
+
+WEEK_LABELS = {WEEK_ODD: "нечетные", WEEK_EVEN: "четные"}
+
+PRODID = '-//misis-itkn-schedule//Schedule Parser//RU'
+UID_DOMAIN = 'misis-itkn-schedule'
+TZID = 'Europe/Moscow'
+
+# Москва живет в UTC+3 без перехода на летнее время с 2014 года,
+# поэтому достаточно одного блока STANDARD
+VTIMEZONE_LINES = [
+    'BEGIN:VTIMEZONE',
+    f'TZID:{TZID}',
+    'BEGIN:STANDARD',
+    'DTSTART:19700101T000000',
+    'TZOFFSETFROM:+0300',
+    'TZOFFSETTO:+0300',
+    'TZNAME:MSK',
+    'END:STANDARD',
+    'END:VTIMEZONE',
+]
+
+MAX_LINE_OCTETS = 75
+
+def escape_text(value):
+    """Экранирует значение TEXT по RFC 5545"""
+    return (str(value).replace('\\', '\\\\').replace(';', '\\;')
+            .replace(',', '\\,').replace('\r\n', '\\n').replace('\n', '\\n'))
+
+def fold_line(line):
+    """Переносит строку длиннее 75 октетов и добавляет CRLF"""
+    encoded = line.encode('utf-8')
+    if len(encoded) <= MAX_LINE_OCTETS:
+        return line + '\r\n'
+
+    chunks = []
+    chunk = ''
+    chunk_octets = 0
+    limit = MAX_LINE_OCTETS
+    for char in line:
+        char_octets = len(char.encode('utf-8'))
+        if chunk_octets + char_octets > limit:
+            chunks.append(chunk)
+            chunk = ''
+            chunk_octets = 0
+            limit = MAX_LINE_OCTETS - 1  # пробел в начале строки продолжения
+        chunk += char
+        chunk_octets += char_octets
+    chunks.append(chunk)
+    return '\r\n '.join(chunks) + '\r\n'
+
+def format_local(dt):
+    return dt.strftime('%Y%m%dT%H%M%S')
+
+def format_utc(dt):
+    return dt.strftime('%Y%m%dT%H%M%SZ')
+
+def make_uid(group_name, lesson):
+    """Стабильный UID из группы, дня, пары и предмета"""
+    key = f"{group_name}|{lesson.day}|{lesson.slot}|{lesson.subject}"
+    if lesson.week:
+        key += f"|{lesson.week}"
+    return f"{hashlib.sha1(key.encode('utf-8')).hexdigest()}@{UID_DOMAIN}"
+
+def format_dates(dates, start):
+    return ','.join(format_local(datetime.combine(date, start)) for date in dates)
+
+def iter_event_lines(lesson, group_name, uid, semester, until, dtstamp):
+    """Строки одного VEVENT (без переноса); пусто, если занятие не попадает в семестр.
+
+    Занятие с днем или парой вне недели — ошибка данных, а не пустое
+    событие: ValueError, чтобы оно не пропадало из календаря молча.
+    """
+    if not is_valid_slot(lesson.day, lesson.slot):
+        raise ValueError(f"{group_name}: «{lesson.subject}» — день {lesson.day}, пара {lesson.slot} вне недели")
+    first_lesson_date = semester.first_date(lesson.day, lesson.week)
+    if first_lesson_date is None:
+        return
+    start_datetime = datetime.combine(first_lesson_date, lesson.start)
+    end_datetime = datetime.combine(first_lesson_date, lesson.end)
+
+    description = (f"Группа: {group_name}\nПреподаватель: {lesson.teacher}\n"
+                   f"Тип: {lesson.type}\nАудитория: {lesson.location}")
+    if lesson.week:
+        description += f"\nНедели: {WEEK_LABELS[lesson.week]}"
+
+    rule = 'RRULE:FREQ=WEEKLY'
+    interval = semester.interval(lesson.week)
+    if interval != 1:
+        rule += f';INTERVAL={interval}'
+
+    yield 'BEGIN:VEVENT'
+    yield f'UID:{uid}'
+    yield f'DTSTAMP:{dtstamp}'
+    yield f'DTSTART;TZID={TZID}:{format_local(start_datetime)}'
+    yield f'DTEND;TZID={TZID}:{format_local(end_datetime)}'
+    yield f'{rule};UNTIL={until}'
+    exdates = semester.exdates(lesson.day, lesson.week)
+    if exdates:
+        yield f'EXDATE;TZID={TZID}:{format_dates(exdates, lesson.start)}'
+    rdates = semester.rdates(lesson.day, lesson.week)
+    if rdates:
+        yield f'RDATE;TZID={TZID}:{format_dates(rdates, lesson.start)}'
+    yield f"SUMMARY:{escape_text(lesson.subject + ' (' + lesson.type + ')')}"
+    yield f"LOCATION:{escape_text(lesson.location)}"
+    yield f'DESCRIPTION:{escape_text(description)}'
+    yield 'END:VEVENT'
+
+def iter_calendar_lines(lessons, group_name, semester, timezone=None):
+    """Генератор строк календаря группы с CRLF, готовых к записи в файл.
+
+    События выдаются по одному, поэтому память не зависит от их числа.
+    """
+    entries = ((group_name, lesson) for lesson in lessons)
+    return iter_combined_calendar_lines(entries, "Расписание " + group_name,
+                                        "Расписание занятий для группы " + group_name,
+                                        semester, timezone)
+
+def iter_combined_calendar_lines(entries, calendar_name, calendar_description, semester,
+                                 timezone=None, uid_prefix=''):
+    """Генератор строк календаря из пар (группы, занятие).
+
+    Используется и для календарей преподавателей и аудиторий, где в одном
+    календаре встречаются занятия разных групп. uid_prefix отделяет UID
+    таких календарей от UID календарей групп.
+    """
+    import pytz
+
+    timezone = timezone or pytz.timezone(TZID)
+    until_local = timezone.localize(datetime.combine(semester.end_date.date(), time(23, 59, 59)))
+    until = format_utc(until_local.astimezone(pytz.utc))
+    # DTSTAMP фиксирован, иначе каждая генерация меняла бы все события
+    dtstamp = format_utc(timezone.localize(semester.start_date).astimezone(pytz.utc))
+
+    header = [
+        'BEGIN:VCALENDAR',
+        'VERSION:2.0',
+        f'PRODID:{PRODID}',
+        'CALSCALE:GREGORIAN',
+        'METHOD:PUBLISH',
+        f'X-WR-CALNAME:{escape_text(calendar_name)}',
+        f'X-WR-CALDESC:{escape_text(calendar_description)}',
+        f'X-WR-TIMEZONE:{TZID}',
+    ]
+    for line in header + VTIMEZONE_LINES:
+        yield fold_line(line)
+
+    seen_uids = set()
+    for group_name, lesson in entries:
+        uid = make_uid(uid_prefix + group_name, lesson)
+        # Одинаковые занятия в одной паре (например, у подгрупп) различаются суффиксом
+        suffix = 2
+        base_uid = uid
+        while uid in seen_uids:
+            uid = base_uid.replace('@', f'-{suffix}@', 1)
+            suffix += 1
+        seen_uids.add(uid)
+
+        for line in iter_event_lines(lesson, group_name, uid, semester, until, dtstamp):
+            yield fold_line(line)
+
+    yield fold_line('END:VCALENDAR')
@@ -0,0 +1,114 @@
+"""Компактное представление занятия.
+
+Занятие хранится как объект с __slots__ вместо словаря из семи ключей.
+Предмет, тип, преподаватель и аудитория интернируются: в книге на сотни
+групп одни и те же строки повторяются тысячи раз и после интернирования
+занимают память один раз. Время начала и конца не хранится в занятии —
+номер пары указывает в заранее посчитанную таблицу LESSON_TIMES.
+"""
+import sys
+from datetime import datetime, time
+
+# Время пар: номер пары → (начало, конец)
+LESSON_TIMES = {
+    1: (time(9, 0), time(10, 35)),
+    2: (time(10, 40), time(12, 15)),
+    3: (time(12, 40), time(14, 15)),
+    4: (time(14, 20), time(15, 55)),
+    5: (time(16, 20), time(17, 55)),
+    6: (time(18, 0), time(19, 35)),
+    7: (time(19, 40), time(21, 15)),
+}
+
+# Длительность пар в минутах, считается один раз при импорте
+LESSON_DURATIONS = {
+    slot: (datetime.combine(datetime.min, end) - datetime.combine(datetime.min, start)).seconds // 60
+    for slot, (start, end) in LESSON_TIMES.items()
+}
+
+# Дни недели: индекс — Lesson.day (0 — понедельник)
+DAY_NAMES = ["Понедельник", "Вторник", "Среда", "Четверг", "Пятница", "Суббота", "Воскресенье"]
+DAY_NAMES_SHORT = ["Пн", "Вт", "Ср", "Чт", "Пт", "Сб", "Вс"]
+DAYS_PER_WEEK = len(DAY_NAMES)
+
+def day_name(day, short=False):
+    """Название дня по индексу; для индекса вне недели — «День N»"""
+    names = DAY_NAMES_SHORT if short else DAY_NAMES
+    return names[day] if 0 <= day < len(names) else f"День {day}"
+
+def is_valid_slot(day, slot):
+    """Есть ли (день, пара) в неделе: день 0–6 и пара из LESSON_TIMES"""
+    return 0 <= day < DAYS_PER_WEEK and slot in LESSON_TIMES
+
+# Недели, по которым идет занятие
+WEEK_ALL = 0
+WEEK_ODD = 1
+WEEK_EVEN = 2
+
+LESSON_FIELDS = ("subject", "day", "slot", "location", "teacher", "type", "week")
+
+class Lesson:
+    """Одно занятие группы: день (0 — понедельник), номер пары и четность недели"""
+
+    __slots__ = LESSON_FIELDS
+
+    def __init__(self, subject, day, slot, location="Не указано", teacher="Не указан", type="Занятие",
+                 week=WEEK_ALL):
+        self.subject = sys.intern(subject)
+        self.day = day
+        self.slot = slot
+        self.location = sys.intern(location)
+        self.teacher = sys.intern(teacher)
+        self.type = sys.intern(type)
+        self.week = week
+
+    @property
+    def start(self):
+        return LESSON_TIMES[self.slot][0]
+
+    @property
+    def end(self):
+        return LESSON_TIMES[self.slot][1]
+
+    @property
+    def duration(self):
+        return LESSON_DURATIONS[self.slot]
+
+    @property
+    def start_time(self):
+        """Время начала строкой, например "9:00" """
+        return f"{self.start.hour}:{self.start.minute:02d}"
+
+    def to_dict(self):
+        """Словарь для JSON-кешей"""
+        return {field: getattr(self, field) for field in LESSON_FIELDS}
+
+    @classmethod
+    def from_dict(cls, data):
+        """Обратное преобразование; лишние ключи (start_time, duration) игнорируются"""
+        return cls(**{field: data[field] for field in LESSON_FIELDS if field in data})
+
+    def __reduce__(self):
+        # При передаче из дочернего процесса строки интернируются заново
+        return (Lesson, tuple(getattr(self, field) for field in LESSON_FIELDS))
+
+    def __eq__(self, other):
+        if not isinstance(other, Lesson):
+            return NotImplemented
+        return all(getattr(self, field) == getattr(other, field) for field in LESSON_FIELDS)
+
+    def __hash__(self):
+        return hash(tuple(getattr(self, field) for field in LESSON_FIELDS))
+
+    def __repr__(self):
+        return f"Lesson({self.subject!r}, day={self.day}, slot={self.slot}, type={self.type!r})"
+
+def lessons_to_dicts(lessons_by_group):
+    """«группа → [Lesson]» в «группа → [dict]» для сериализации"""
+    return {group: [lesson.to_dict() for lesson in lessons]
+            for group, lessons in lessons_by_group.items()}
+
+def lessons_from_dicts(data):
+    """Обратное преобразование lessons_to_dicts"""
+    return {group: [Lesson.from_dict(item) for item in lessons]
+            for group, lessons in data.items()}
@@ -0,0 +1,125 @@
+"""Поиск ссылок на файлы расписания на странице misis.ru.
+
+Страница разбирается потоково подклассом html.parser.HTMLParser без
+построения дерева документа: сканер запоминает только заголовок текущего
+института и ссылки на книги .xls и .xlsx. Если задан нужный институт, разбор
+прекращается, как только его раздел закончился (начался раздел
+следующего института), и остаток страницы не читается.
+
+Каждая ссылка возвращается как ScheduleLink:
+
+    ScheduleLink(url, text, institute, course, revision)
+
+где course — номер курса из текста ссылки, revision — дата редакции из
+имени файла (itkn_010925.xls → 2025-09-01).
+"""
+import os
+import re
+from collections import namedtuple
+from datetime import date
+from html.parser import HTMLParser
+from urllib.parse import urljoin, urlsplit
+
+ScheduleLink = namedtuple('ScheduleLink', ['url', 'text', 'institute', 'course', 'revision'])
+
+# Раздел страницы начинается с текста вида «Институт компьютерных наук»
+INSTITUTE_PATTERN = re.compile(r'Институт\s+[^\n\r.,:;()]+', re.IGNORECASE)
+COURSE_PATTERN = re.compile(r'(\d)\s*-?\s*(?:й\s*)?курс', re.IGNORECASE)
+REVISION_PATTERN = re.compile(r'(\d{2})(\d{2})(\d{2})')
+CHARSET_PATTERN = re.compile(rb'charset=["\']?([\w-]+)', re.IGNORECASE)
+CHUNK_SIZE = 16 * 1024
+# Расширения файлов расписания: workbook_reader читает оба формата
+SCHEDULE_EXTENSIONS = ('.xls', '.xlsx')
+
+def parse_revision(url):
+    """Дата редакции из имени файла в формате ДДММГГ или None"""
+    match = REVISION_PATTERN.search(os.path.basename(urlsplit(url).path))
+    if not match:
+        return None
+    day, month, year = (int(part) for part in match.groups())
+    try:
+        return date(2000 + year, month, day)
+    except ValueError:
+        return None
+
+def parse_course(text):
+    match = COURSE_PATTERN.search(text)
+    return int(match.group(1)) if match else None
+
+def decode_page(content):
+    """Декодирует страницу по charset из начала документа (по умолчанию UTF-8)"""
+    if isinstance(content, str):
+        return content
+    match = CHARSET_PATTERN.search(content[:2048])
+    encodings = [match.group(1).decode('ascii')] if match else []
+    for encoding in encodings + ['utf-8']:
+        try:
+            return content.decode(encoding)
+        except (LookupError, UnicodeDecodeError):
+            continue
+    return content.decode('cp1251', errors='replace')
+
+class _SectionFinished(Exception):
+    """Раздел нужного института закончился, дальше читать не нужно"""
+
+class LinkScanner(HTMLParser):
+    """Потоковый сканер: собирает ссылки на .xls/.xlsx и заголовок раздела"""
+
+    def __init__(self, base_url, institute=None):
+        super().__init__(convert_charrefs=True)
+        self.base_url = base_url
+        self.target = institute.lower() if institute else None
+        self.institute = None
+        self.in_target = False
+        self.links = []
+        self._href = None
+        self._text = []
+
+    def handle_starttag(self, tag, attrs):
+        if tag != 'a':
+            return
+        href = dict(attrs).get('href') or ''
+        if urlsplit(href).path.lower().endswith(SCHEDULE_EXTENSIONS):
+            self._href = href
+            self._text = []
+
+    def handle_endtag(self, tag):
+        if tag != 'a' or self._href is None:
+            return
+        text = ' '.join(''.join(self._text).split())
+        url = urljoin(self.base_url, self._href)
+        self.links.append(ScheduleLink(url, text, self.institute, parse_course(text), parse_revision(url)))
+        self._href = None
+
+    def handle_data(self, data):
+        if self._href is not None:
+            self._text.append(data)
+            return
+        match = INSTITUTE_PATTERN.search(data)
+        if not match:
+            return
+        institute = ' '.join(match.group(0).split())
+        if self.in_target and institute.lower() != self.institute.lower():
+            raise _SectionFinished()
+        self.institute = institute
+        self.in_target = bool(self.target) and self.target in institute.lower()
+
+def find_schedule_links(page_content, base_url, institute=None):
+    """Список ScheduleLink в порядке появления на странице.
+
+    Если задан institute (подстрока названия), разбор останавливается
+    после окончания раздела этого института.
+    """
+    text = decode_page(page_content)
+    scanner = LinkScanner(base_url, institute)
+    try:
+        for offset in range(0, len(text), CHUNK_SIZE):
+            scanner.feed(text[offset:offset + CHUNK_SIZE])
+        scanner.close()
+    except _SectionFinished:
+        pass
+    return scanner.links
+
+def latest_first(links):
+    """Ссылки от последней редакции к первой; без даты — в конце"""
+    return sorted(links, key=lambda link: link.revision or date.min, reverse=True)
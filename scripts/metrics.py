@@ -0,0 +1,78 @@
+"""Замеры по этапам обработки расписания.
+
+Каждый этап оборачивается в span(), который записывает время выполнения
+и переданные счетчики (байты, количество элементов). Собранные записи
+сохраняются в JSON lines или в текстовом формате Prometheus.
+"""
+import json
+import time
+from contextlib import contextmanager
+
+_records = []
+
+@contextmanager
+def span(stage, **fields):
+    """Замеряет этап; счетчики можно дописать в возвращаемый словарь.
+
+        with span("download", url=url) as record:
+            content = ...
+            record["bytes"] = len(content)
+    """
+    record = {"stage": stage}
+    record.update(fields)
+    started_at = time.time()
+    started = time.perf_counter()
+    try:
+        yield record
+    except BaseException as e:
+        record["error"] = type(e).__name__
+        raise
+    finally:
+        record["started_at"] = round(started_at, 3)
+        record["wall_ms"] = round((time.perf_counter() - started) * 1000, 3)
+        _records.append(record)
+
+def get_records():
+    return list(_records)
+
+def reset():
+    _records.clear()
+
+def write_jsonl(path):
+    """Сохраняет записи построчно в JSON"""
+    with open(path, 'w', encoding='utf-8') as f:
+        for record in _records:
+            f.write(json.dumps(record, ensure_ascii=False) + '\n')
+
+def _escape_label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def write_prometheus(path):
+    """Сохраняет суммарные показатели по этапам в текстовом формате Prometheus"""
+    totals = {}
+    for record in _records:
+        stage_totals = totals.setdefault(record["stage"], {"wall_ms": 0.0, "bytes": 0, "items": 0, "count": 0})
+        stage_totals["wall_ms"] += record["wall_ms"]
+        stage_totals["bytes"] += record.get("bytes", 0)
+        stage_totals["items"] += record.get("items", 0)
+        stage_totals["count"] += 1
+
+    metrics = [
+        ("schedule_stage_seconds", "Время выполнения этапа", lambda t: t["wall_ms"] / 1000),
+        ("schedule_stage_bytes", "Обработано байт на этапе", lambda t: t["bytes"]),
+        ("schedule_stage_items", "Обработано элементов на этапе", lambda t: t["items"]),
+        ("schedule_stage_runs", "Число запусков этапа", lambda t: t["count"]),
+    ]
+    with open(path, 'w', encoding='utf-8') as f:
+        for name, help_text, value in metrics:
+            f.write(f"# HELP {name} {help_text}\n")
+            f.write(f"# TYPE {name} gauge\n")
+            for stage, stage_totals in totals.items():
+                f.write(f'{name}{{stage="{_escape_label(stage)}"}} {value(stage_totals)}\n')
+
+def write_metrics(path):
+    """Выбирает формат по расширению: .prom — Prometheus, иначе JSON lines"""
+    if path.endswith('.prom'):
+        write_prometheus(path)
+    else:
+        write_jsonl(path)
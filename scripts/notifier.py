@@ -0,0 +1,184 @@
+"""Очередь уведомлений Telegram с ограничением частоты и сохранением на диск.
+
+Сообщения сначала записываются в outbox (.cache/telegram_outbox.json) и
+только потом отправляются, поэтому неотправленные из-за ошибки сети или
+перезапуска сообщения уйдут при следующем вызове flush(). В CI outbox
+не коммитится (в нем chat_id из секретов) и живет в actions/cache, который
+GitHub удаляет после 7 дней без обращений: при еженедельном запуске
+неотправленные сообщения могут не дожить до следующего запуска. При отправке:
+  - несколько сообщений в один чат склеиваются в одно, пока оно
+    укладывается в лимит длины Telegram;
+  - частота ограничивается двумя token bucket: общим для бота и
+    отдельным для каждого чата;
+  - ответ 429 приостанавливает чат на retry_after секунд;
+  - чаты обслуживаются параллельно в asyncio, запросы идут через общую
+    сессию requests с пулом соединений.
+"""
+import asyncio
+import json
+import os
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from atomic_file import write_atomic
+from http_cache import CACHE_ROOT, get_session
+from metrics import span
+
+API_URL = os.getenv('TELEGRAM_API_URL', 'https://api.telegram.org')
+OUTBOX_PATH = os.path.join(CACHE_ROOT, 'telegram_outbox.json')
+
+GLOBAL_RATE = 25.0          # сообщений в секунду на бота (лимит Telegram — 30)
+CHAT_RATE = 1.0             # сообщений в секунду в один чат
+MAX_MESSAGE_LENGTH = 4096
+MAX_ATTEMPTS = 5            # попыток за один flush при ответах 429
+MAX_CONCURRENT = 8          # одновременных HTTP-запросов
+OUTBOX_MAX_AGE = 3 * 24 * 60 * 60  # сообщения старше трех суток отбрасываются
+SEPARATOR = '\n\n➖➖➖\n\n'
+
+def chat_ids_from_env():
+    """Чаты из TELEGRAM_CHAT_ID; несколько чатов перечисляются через запятую"""
+    return [chat_id.strip() for chat_id in os.getenv('TELEGRAM_CHAT_ID', '').split(',') if chat_id.strip()]
+
+class TokenBucket:
+    """Token bucket для asyncio: rate токенов в секунду, не больше capacity"""
+
+    def __init__(self, rate, capacity=1.0):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+
+    def pause(self, seconds):
+        """Не выдавать токены seconds секунд (ответ 429)"""
+        self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+
+    async def acquire(self):
+        while True:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if now >= self.blocked_until and self.tokens >= 1:
+                self.tokens -= 1
+                return
+            await asyncio.sleep(max(self.blocked_until - now, (1 - self.tokens) / self.rate))
+
+class Outbox:
+    """Сообщения, ожидающие отправки; каждое изменение сразу пишется на диск"""
+
+    def __init__(self, path=OUTBOX_PATH):
+        self.path = path
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                self.messages = json.load(f)
+        except (OSError, ValueError):
+            self.messages = []
+
+    def _save(self):
+        write_atomic(self.path, json.dumps(self.messages, ensure_ascii=False))
+
+    def add(self, chat_id, text):
+        self.messages.append({
+            "id": uuid.uuid4().hex,
+            "chat_id": chat_id,
+            "text": text,
+            "created_at": time.time(),
+        })
+        self._save()
+
+    def remove(self, ids):
+        ids = set(ids)
+        self.messages = [message for message in self.messages if message["id"] not in ids]
+        self._save()
+
+    def drop_expired(self, max_age=OUTBOX_MAX_AGE):
+        """Удаляет устаревшие сообщения и возвращает их число"""
+        deadline = time.time() - max_age
+        expired = [message["id"] for message in self.messages if message["created_at"] < deadline]
+        if expired:
+            self.remove(expired)
+        return len(expired)
+
+def coalesce(messages, max_length=MAX_MESSAGE_LENGTH):
+    """Склеивает сообщения по чатам: «чат → [(ids, текст)]» с сохранением порядка"""
+    batches = {}
+    for message in messages:
+        chat_batches = batches.setdefault(message["chat_id"], [])
+        if chat_batches:
+            ids, text = chat_batches[-1]
+            combined = text + SEPARATOR + message["text"]
+            if len(combined) <= max_length:
+                chat_batches[-1] = (ids + [message["id"]], combined)
+                continue
+        chat_batches.append(([message["id"]], message["text"]))
+    return batches
+
+def post_message(bot_token, chat_id, text, timeout=10):
+    """Отправляет одно сообщение; возвращает (код, retry_after, описание ошибки)"""
+    try:
+        response = get_session().post(f"{API_URL}/bot{bot_token}/sendMessage",
+                                      json={'chat_id': chat_id, 'text': text, 'parse_mode': 'HTML'},
+                                      timeout=timeout)
+    except Exception as e:
+        return None, None, str(e)
+    if response.status_code == 200:
+        return 200, None, None
+    try:
+        data = response.json()
+    except ValueError:
+        data = {}
+    retry_after = data.get("parameters", {}).get("retry_after")
+    return response.status_code, retry_after, data.get("description", response.text)
+
+async def dispatch(outbox, bot_token, log=print):
+    """Отправляет содержимое outbox; возвращает (отправлено, осталось в очереди)"""
+    loop = asyncio.get_running_loop()
+    global_bucket = TokenBucket(GLOBAL_RATE, capacity=GLOBAL_RATE)
+    sent = 0
+
+    async def send_chat(executor, chat_id, chat_batches):
+        nonlocal sent
+        bucket = TokenBucket(CHAT_RATE)
+        for ids, text in chat_batches:
+            for _ in range(MAX_ATTEMPTS):
+                await bucket.acquire()
+                await global_bucket.acquire()
+                status, retry_after, error = await loop.run_in_executor(
+                    executor, post_message, bot_token, chat_id, text)
+                if status == 200:
+                    outbox.remove(ids)
+                    sent += 1
+                    break
+                if status == 429:
+                    log(f"⏳ Telegram просит подождать {retry_after} с (чат {chat_id})")
+                    bucket.pause(retry_after or 1)
+                    continue
+                if status is not None and 400 <= status < 500:
+                    # Повтор не поможет (неверный чат, бот заблокирован, ошибка разметки)
+                    log(f"❌ Telegram отклонил сообщение в чат {chat_id}: {status} - {error}")
+                    outbox.remove(ids)
+                    break
+                log(f"❌ Ошибка отправки в Telegram (чат {chat_id}): {status or error}")
+                return  # остальное уйдет при следующем запуске, порядок сохраняется
+            else:
+                return
+
+    with ThreadPoolExecutor(max_workers=MAX_CONCURRENT) as executor:
+        await asyncio.gather(*(send_chat(executor, chat_id, chat_batches)
+                               for chat_id, chat_batches in coalesce(outbox.messages).items()))
+    return sent, len(outbox.messages)
+
+def flush(bot_token, outbox=None, log=print):
+    """Синхронная обертка над dispatch() для вызова из обычного кода"""
+    outbox = outbox or Outbox()
+    expired = outbox.drop_expired()
+    if expired:
+        log(f"ℹ️ Отброшено устаревших уведомлений: {expired}")
+    if not outbox.messages:
+        return 0, 0
+    with span("telegram_send", items=len(outbox.messages),
+              bytes=sum(len(message["text"].encode('utf-8')) for message in outbox.messages)) as record:
+        sent, pending = asyncio.run(dispatch(outbox, bot_token, log))
+        record["sent"] = sent
+    return sent, pending
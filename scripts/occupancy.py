@@ -0,0 +1,179 @@
+"""Обратные индексы по аудиториям и преподавателям.
+
+Из одного разбора всех групп строятся:
+  - аудитория → битовая маска занятых (день, пара);
+  - преподаватель → занятия во всех группах и такая же битовая маска.
+Маска состоит из двух половин — нечетной и четной недели: занятие только
+по нечетным или только по четным неделям занимает бит в своей половине,
+занятие на всех неделях — в обеих. Проверка занятости аудитории или
+преподавателя в конкретной паре — одна битовая операция.
+
+    python scripts/occupancy.py free-rooms --day вт --slot 3 --week чет
+    python scripts/occupancy.py teacher Булатов
+"""
+import argparse
+import contextlib
+import sys
+
+from lesson_model import DAYS_PER_WEEK, LESSON_TIMES, WEEK_ALL, WEEK_EVEN, WEEK_ODD, day_name, is_valid_slot
+
+SLOTS_PER_DAY = len(LESSON_TIMES)
+# Сдвиг половины маски четной недели относительно нечетной
+EVEN_WEEK_SHIFT = DAYS_PER_WEEK * SLOTS_PER_DAY
+WEEK_NAMES = {WEEK_ODD: "нечетная", WEEK_EVEN: "четная"}
+UNKNOWN_VALUES = {"Не указано", "Не указан", ""}
+
+def slot_bit(day, slot, week=WEEK_ALL):
+    """Биты (день, пара) в маске занятости.
+
+    Для WEEK_ALL возвращаются оба бита: и нечетной, и четной недели.
+    (день, пара) вне недели дали бы бит в чужой половине маски, поэтому — ValueError.
+    """
+    if not is_valid_slot(day, slot):
+        raise ValueError(f"день {day}, пара {slot} вне недели")
+    bit = 1 << (day * SLOTS_PER_DAY + slot - 1)
+    if week == WEEK_ODD:
+        return bit
+    if week == WEEK_EVEN:
+        return bit << EVEN_WEEK_SHIFT
+    return bit | bit << EVEN_WEEK_SHIFT
+
+def build_indexes(lessons_by_group):
+    """Строит индексы за один проход по всем занятиям всех групп"""
+    room_bits = {}
+    teacher_bits = {}
+    teacher_lessons = {}
+
+    for group, lessons in lessons_by_group.items():
+        for lesson in lessons:
+            if not is_valid_slot(lesson.day, lesson.slot):
+                # Например, ревизия истории от версии парсера без проверки дней
+                print(f"⚠️ {group}: «{lesson.subject}» — день {lesson.day}, пара {lesson.slot} вне недели, "
+                      f"пропущено", file=sys.stderr)
+                continue
+            bit = slot_bit(lesson.day, lesson.slot, lesson.week)
+
+            room = lesson.location
+            if room not in UNKNOWN_VALUES:
+                room_bits[room] = room_bits.get(room, 0) | bit
+
+            teacher = lesson.teacher
+            if teacher not in UNKNOWN_VALUES:
+                teacher_bits[teacher] = teacher_bits.get(teacher, 0) | bit
+                teacher_lessons.setdefault(teacher, []).append((group, lesson))
+
+    return {
+        "rooms": room_bits,
+        "teachers": teacher_bits,
+        "teacher_lessons": teacher_lessons,
+    }
+
+def is_room_free(indexes, room, day, slot, week=WEEK_ALL):
+    """Свободна ли аудитория в (день, пара); при WEEK_ALL — на обеих неделях"""
+    return not indexes["rooms"].get(room, 0) & slot_bit(day, slot, week)
+
+def is_teacher_busy(indexes, teacher, day, slot, week=WEEK_ALL):
+    """Занят ли преподаватель в (день, пара); при WEEK_ALL — хотя бы на одной неделе"""
+    return bool(indexes["teachers"].get(teacher, 0) & slot_bit(day, slot, week))
+
+def free_rooms(indexes, day, slot, week=WEEK_ALL):
+    """Аудитории, известные по расписанию и свободные в (день, пара).
+
+    week выбирает неделю; при WEEK_ALL аудитория должна быть свободна на обеих.
+    """
+    bit = slot_bit(day, slot, week)
+    return sorted(room for room, bits in indexes["rooms"].items() if not bits & bit)
+
+def find_teachers(indexes, query):
+    """Преподаватели, в имени которых встречается query (без учета регистра)"""
+    query = query.lower()
+    return sorted(teacher for teacher in indexes["teacher_lessons"] if query in teacher.lower())
+
+def teacher_week(indexes, teacher):
+    """Неделя преподавателя: одно занятие потока объединяет все его группы.
+
+    Возвращает список словарей с полями day, slot, week, subject, type,
+    location и groups, отсортированный по дню, паре и неделе.
+    """
+    merged = {}
+    for group, lesson in indexes["teacher_lessons"].get(teacher, []):
+        key = (lesson.day, lesson.slot, lesson.week, lesson.subject, lesson.type, lesson.location)
+        entry = merged.get(key)
+        if entry is None:
+            entry = {
+                "day": lesson.day,
+                "slot": lesson.slot,
+                "week": lesson.week,
+                "subject": lesson.subject,
+                "type": lesson.type,
+                "location": lesson.location,
+                "groups": [],
+            }
+            merged[key] = entry
+        entry["groups"].append(group)
+
+    return sorted(merged.values(), key=lambda entry: (entry["day"], entry["slot"], entry["week"]))
+
+def parse_week(value):
+    """Принимает название недели или его начало: «нечет», «чет»"""
+    value = value.lower().replace("ё", "е")
+    for week, name in WEEK_NAMES.items():
+        if name.startswith(value):
+            return week
+    raise argparse.ArgumentTypeError(f"неизвестная неделя: {value}")
+
+def load_lessons_by_group(args):
+    """Берет занятия из XLS файла или из последней ревизии истории"""
+    if args.xls:
+        from schedule_parser import parse_xls_all_groups
+
+        # Отладочный вывод парсера не смешивается с результатом запроса
+        with open(args.xls, 'rb') as f, contextlib.redirect_stdout(sys.stderr):
+            return parse_xls_all_groups(f.read())
+
+    import history_store
+
+    connection = history_store.connect(args.db, create=False)
+    try:
+        return history_store.load_lessons_by_group(connection, args.revision)
+    finally:
+        connection.close()
+
+def main():
+    import history_store
+
+    parser = argparse.ArgumentParser(description="Занятость аудиторий и преподавателей")
+    parser.add_argument('--xls', help="разобрать XLS файл вместо чтения истории")
+    parser.add_argument('--db', default=history_store.DB_PATH, help="путь к базе истории")
+    parser.add_argument('--revision', type=int, help="ревизия из истории (по умолчанию последняя)")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    rooms_parser = commands.add_parser('free-rooms', help="свободные аудитории в паре")
+    rooms_parser.add_argument('--day', type=history_store.parse_day, required=True)
+    rooms_parser.add_argument('--slot', type=history_store.parse_slot, required=True)
+    rooms_parser.add_argument('--week', type=parse_week, default=WEEK_ALL,
+                              help="«нечет» или «чет»; по умолчанию аудитория свободна на обеих неделях")
+
+    teacher_parser = commands.add_parser('teacher', help="неделя преподавателя")
+    teacher_parser.add_argument('name', help="фамилия или ее часть")
+
+    args = parser.parse_args()
+    try:
+        indexes = build_indexes(load_lessons_by_group(args))
+    except FileNotFoundError as e:
+        parser.error(str(e))
+
+    if args.command == 'free-rooms':
+        for room in free_rooms(indexes, args.day, args.slot, args.week):
+            print(room)
+        return
+
+    for teacher in find_teachers(indexes, args.name):
+        print(teacher)
+        for entry in teacher_week(indexes, teacher):
+            week_name = f" ({WEEK_NAMES[entry['week']]} неделя)" if entry["week"] in WEEK_NAMES else ""
+            print(f"  {day_name(entry['day'])}, {entry['slot']} пара{week_name}: "
+                  f"{entry['subject']} ({entry['type']}), {entry['location']} — {', '.join(entry['groups'])}")
+
+if __name__ == "__main__":
+    main()
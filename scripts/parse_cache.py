@@ -0,0 +1,86 @@
+"""Кеш результатов парсинга, адресуемый хешем содержимого XLS.
+
+Ключ строится из версии парсера и SHA-256 байтов файла, поэтому
+одинаковый файл не разбирается повторно, а смена PARSER_VERSION
+в коде делает старые записи недействительными.
+
+Для новой редакции файла кеш целиком не подходит, поэтому отдельно
+хранятся колонки последней разобранной редакции: для каждого листа
+«группа → (отпечаток колонки, занятия)». Группы, колонки которых не
+изменились, берутся отсюда без повторного разбора.
+"""
+import hashlib
+import json
+import os
+
+from atomic_file import write_atomic
+from http_cache import CACHE_ROOT
+from lesson_model import Lesson, lessons_from_dicts, lessons_to_dicts
+
+PARSE_CACHE_DIR = os.path.join(CACHE_ROOT, 'parsed')
+# Вне PARSE_CACHE_DIR, чтобы не попасть под вытеснение старых записей
+COLUMN_CACHE_PATH = os.path.join(CACHE_ROOT, 'parsed_columns.json')
+MAX_ENTRIES = 8
+
+def content_hash(content):
+    """SHA-256 от байтов файла"""
+    return hashlib.sha256(content).hexdigest()
+
+def cache_key(content, parser_version):
+    return f"v{parser_version}-{content_hash(content)}"
+
+def _entry_path(key):
+    return os.path.join(PARSE_CACHE_DIR, key + '.json')
+
+def load_parsed_schedule(content, parser_version):
+    """Возвращает сохраненный словарь «группа → занятия» или None"""
+    path = _entry_path(cache_key(content, parser_version))
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return None
+
+    # Обновляем время доступа, чтобы запись не была вытеснена первой
+    os.utime(path)
+    return lessons_from_dicts(data)
+
+def store_parsed_schedule(content, parser_version, lessons_by_group):
+    """Сохраняет результат парсинга и вытесняет самые старые записи"""
+    path = _entry_path(cache_key(content, parser_version))
+    write_atomic(path, json.dumps(lessons_to_dicts(lessons_by_group), ensure_ascii=False, separators=(',', ':')))
+    evict_old_entries()
+
+def evict_old_entries(max_entries=MAX_ENTRIES):
+    """Оставляет в кеше только max_entries последних записей"""
+    entries = [os.path.join(PARSE_CACHE_DIR, name)
+               for name in os.listdir(PARSE_CACHE_DIR) if name.endswith('.json')]
+    entries.sort(key=os.path.getmtime, reverse=True)
+    for path in entries[max_entries:]:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+def load_column_cache(parser_version, path=COLUMN_CACHE_PATH):
+    """Колонки последней редакции: список «группа → (отпечаток, занятия)» по листам или None"""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if data.get("version") != parser_version:
+        return None
+    return [{group: (column["fingerprint"], [Lesson.from_dict(lesson) for lesson in column["lessons"]])
+             for group, column in columns.items()}
+            for columns in data["sheets"]]
+
+def store_column_cache(parser_version, sheets, path=COLUMN_CACHE_PATH):
+    """Сохраняет колонки редакции для следующего инкрементального разбора"""
+    data = {
+        "version": parser_version,
+        "sheets": [{group: {"fingerprint": fingerprint, "lessons": [lesson.to_dict() for lesson in lessons]}
+                    for group, (fingerprint, lessons) in columns.items()}
+                   for columns in sheets],
+    }
+    write_atomic(path, json.dumps(data, ensure_ascii=False, separators=(',', ':')))
@@ -0,0 +1,185 @@
+"""Поурочное сравнение расписаний между запусками.
+
+Для каждого занятия хранится отпечаток, проиндексированный по
+(группа, день, пара). Сравнение двух состояний за линейное время дает
+списки добавленных, удаленных, перенесенных и измененных занятий.
+"""
+import hashlib
+import html
+import json
+from operator import attrgetter
+
+from atomic_file import write_atomic
+from lesson_model import day_name
+
+STATE_PATH = 'schedule_state.json'
+CHANGES_PATH = 'schedule_changes.json'
+STATE_VERSION = 1
+
+# Поля занятия, изменение которых считается изменением занятия
+FINGERPRINT_FIELDS = ("subject", "type", "teacher", "location")
+
+FIELD_LABELS = {
+    "subject": "предмет",
+    "type": "тип",
+    "teacher": "преподаватель",
+    "location": "аудитория",
+}
+
+_fingerprint_values = attrgetter(*FINGERPRINT_FIELDS)
+
+MAX_MESSAGE_CHANGES = 20
+
+def _fingerprint(values):
+    return hashlib.sha1('\x1f'.join(values).encode('utf-8')).hexdigest()[:16]
+
+def lesson_fingerprint(lesson):
+    """Отпечаток содержимого занятия (Lesson) без учета дня и пары"""
+    return _fingerprint(_fingerprint_values(lesson))
+
+def slot_key(day, slot, week=0):
+    """Ключ «день:пара»; у занятий по четным или нечетным неделям — «день:пара:неделя»"""
+    return f"{day}:{slot}:{week}" if week else f"{day}:{slot}"
+
+def parse_slot_key(key):
+    day, slot = key.split(':')[:2]
+    return int(day), int(slot)
+
+def build_state(lessons_by_group):
+    """Строит состояние «группа → (день:пара) → занятие с отпечатком»"""
+    groups = {}
+    for group, lessons in lessons_by_group.items():
+        entries = {}
+        for lesson in lessons:
+            values = _fingerprint_values(lesson)
+            entry = dict(zip(FINGERPRINT_FIELDS, values))
+            entry["fp"] = _fingerprint(values)
+            entries[slot_key(lesson.day, lesson.slot, lesson.week)] = entry
+        groups[group] = entries
+    return {"version": STATE_VERSION, "groups": groups}
+
+def load_state(path=STATE_PATH):
+    """Загружает сохраненное состояние или возвращает None"""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            state = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if state.get("version") != STATE_VERSION:
+        return None
+    return state
+
+def save_json(path, data):
+    write_atomic(path, json.dumps(data, ensure_ascii=False, indent=1, sort_keys=True) + '\n')
+
+def save_state(state, path=STATE_PATH):
+    save_json(path, state)
+
+def _public_entry(entry):
+    return {field: entry[field] for field in FINGERPRINT_FIELDS}
+
+def diff_group(old_entries, new_entries):
+    """Сравнивает занятия одной группы"""
+    added = []
+    removed = []
+    modified = []
+
+    for key, new_entry in new_entries.items():
+        old_entry = old_entries.get(key)
+        if old_entry is None:
+            added.append((key, new_entry))
+        elif old_entry["fp"] != new_entry["fp"]:
+            day, slot = parse_slot_key(key)
+            modified.append({
+                "day": day,
+                "slot": slot,
+                "old": _public_entry(old_entry),
+                "new": _public_entry(new_entry),
+                "fields": [field for field in FINGERPRINT_FIELDS if old_entry[field] != new_entry[field]],
+            })
+
+    for key, old_entry in old_entries.items():
+        if key not in new_entries:
+            removed.append((key, old_entry))
+
+    # Перенос: удаленное и добавленное занятие с одинаковым отпечатком
+    removed_by_fp = {}
+    for key, entry in removed:
+        removed_by_fp.setdefault(entry["fp"], []).append(key)
+
+    moved = []
+    moved_from = set()
+    still_added = []
+    for key, entry in added:
+        candidates = removed_by_fp.get(entry["fp"])
+        if candidates:
+            from_key = candidates.pop(0)
+            moved_from.add(from_key)
+            from_day, from_slot = parse_slot_key(from_key)
+            to_day, to_slot = parse_slot_key(key)
+            moved.append({
+                "from": {"day": from_day, "slot": from_slot},
+                "to": {"day": to_day, "slot": to_slot},
+                "lesson": _public_entry(entry),
+            })
+        else:
+            still_added.append((key, entry))
+
+    def located(items):
+        result = []
+        for key, entry in items:
+            day, slot = parse_slot_key(key)
+            result.append({"day": day, "slot": slot, "lesson": _public_entry(entry)})
+        return result
+
+    return {
+        "added": located(still_added),
+        "removed": located((key, entry) for key, entry in removed if key not in moved_from),
+        "moved": moved,
+        "modified": modified,
+    }
+
+def diff_states(old_state, new_state):
+    """Сравнивает два состояния и возвращает изменения по группам.
+
+    В результат попадают только группы с изменениями.
+    """
+    old_groups = old_state["groups"] if old_state else {}
+    new_groups = new_state["groups"]
+
+    changes = {}
+    for group in set(old_groups) | set(new_groups):
+        group_diff = diff_group(old_groups.get(group, {}), new_groups.get(group, {}))
+        if any(group_diff.values()):
+            changes[group] = group_diff
+    return changes
+
+def count_changes(group_diff):
+    return sum(len(items) for items in group_diff.values())
+
+def _slot_label(day, slot):
+    return f"{day_name(day, short=True)}, {slot} пара"
+
+def _lesson_label(lesson):
+    return html.escape(f"{lesson['subject']} ({lesson['type']})")
+
+def format_group_diff(group_diff):
+    """Текст изменений одной группы для Telegram (HTML)"""
+    lines = []
+    for item in group_diff["added"]:
+        lines.append(f"➕ {_slot_label(item['day'], item['slot'])}: {_lesson_label(item['lesson'])}")
+    for item in group_diff["removed"]:
+        lines.append(f"➖ {_slot_label(item['day'], item['slot'])}: {_lesson_label(item['lesson'])}")
+    for item in group_diff["moved"]:
+        lines.append(f"🔀 {_lesson_label(item['lesson'])}: "
+                     f"{_slot_label(item['from']['day'], item['from']['slot'])} → "
+                     f"{_slot_label(item['to']['day'], item['to']['slot'])}")
+    for item in group_diff["modified"]:
+        details = ', '.join(html.escape(f"{FIELD_LABELS[field]} {item['old'][field]} → {item['new'][field]}")
+                            for field in item["fields"])
+        lines.append(f"✏️ {_slot_label(item['day'], item['slot'])}, {_lesson_label(item['old'])}: {details}")
+
+    if len(lines) > MAX_MESSAGE_CHANGES:
+        hidden = len(lines) - MAX_MESSAGE_CHANGES
+        lines = lines[:MAX_MESSAGE_CHANGES] + [f"… и еще {hidden} изменений"]
+    return '\n'.join(lines)
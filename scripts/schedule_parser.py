@@ -1,114 +1,295 @@
-import requests
-from bs4 import BeautifulSoup
 import re
-from urllib.parse import urljoin
-from ics import Calendar, Event
-import pytz
-from datetime import datetime, timedelta
-import os
 import hashlib
+from urllib.parse import unquote, urlsplit, urlunsplit
+from datetime import datetime
+from functools import lru_cache
+import os
+import sys
+import argparse
+import threading
+
+from http_cache import (CACHE_ROOT, cached_get, conditional_request, load_cached_response,
+                        session_conditional_request, store_response)
+from parse_cache import (cache_key, content_hash, load_column_cache, load_parsed_schedule,
+                         store_column_cache, store_parsed_schedule)
+from ics_writer import iter_calendar_lines
+from metrics import span, write_metrics
+import watcher
+from workbook_reader import merge_lessons, parse_workbook
+from link_discovery import find_schedule_links, latest_first
+from lesson_model import (DAYS_PER_WEEK, LESSON_TIMES, WEEK_ALL, WEEK_EVEN, WEEK_ODD, Lesson, day_name,
+                          is_valid_slot)
+from semester import Semester
+from schedule_diff import (CHANGES_PATH, STATE_PATH, build_state, count_changes, diff_states,
+                           format_group_diff, load_state, save_json, save_state)
 
 # Конфигурация
 GROUP_NAME = "ББИ-25-2"
 START_DATE = datetime(2025, 9, 1)  # Начало учебного года
 END_DATE = datetime(2026, 1, 31)   # Конец семестра
-TIMEZONE = pytz.timezone('Europe/Moscow')
-
-# Время пар в формате (начало, конец)
-LESSON_TIMES = {
-    1: ("9:00", "10:35"),
-    2: ("10:40", "12:15"), 
-    3: ("12:40", "14:15"),
-    4: ("14:20", "15:55"),
-    5: ("16:20", "17:55"),
-    6: ("18:00", "19:35"),
-    7: ("19:40", "21:15")
-}
+
+# Нерабочие дни семестра: занятия в эти даты исключаются из календаря (EXDATE)
+HOLIDAYS = [
+    datetime(2025, 11, 3),  # перенос выходного с 1 ноября
+    datetime(2025, 11, 4),  # День народного единства
+    datetime(2025, 12, 31), # перенос выходного с 4 января
+] + [datetime(2026, 1, day) for day in range(1, 9)]  # новогодние каникулы
+
+# Переносы: рабочая дата → дата, по расписанию которой в нее идут занятия (RDATE),
+# например {datetime(2025, 11, 1): datetime(2025, 11, 3)}
+TRANSFER_DAYS = {}
+
+SEMESTER = Semester(START_DATE, END_DATE, HOLIDAYS, TRANSFER_DAYS)
+
+# Адреса можно переопределить через окружение, например для локального стенда:
+# MISIS_SCHEDULE_URL — страница со ссылками, MISIS_FILES_URL — откуда качать файлы
+SCHEDULE_PAGE_URL = os.getenv('MISIS_SCHEDULE_URL', "https://misis.ru/students/schedule/")
+FILES_BASE_URL = os.getenv('MISIS_FILES_URL')
+
+# Раздел ИТКН на странице и признаки его ссылок в тексте
+ITKN_INSTITUTE = 'Институт компьютерных наук'
+ITKN_KEYWORDS = ('иткн', 'институт компьютерных', 'компьютерных', 'икн')
+
+# Год поступления в названии группы: ББИ-25-2 → 2025
+GROUP_YEAR_PATTERN = re.compile(r'-(\d{2})-')
+
+# Ссылка на файл, обработанный при последнем полном запуске (для режима --check)
+LATEST_URL_PATH = os.path.join(CACHE_ROOT, 'latest_schedule_url.txt')
+
+# Ключ сборки, из которой получены schedule.ics и calendars/ (см. build_key)
+BUILD_KEY_PATH = os.path.join(CACHE_ROOT, 'last_build_key.txt')
+
+# Коды выхода режима --check
+CHECK_UNCHANGED = 0
+CHECK_CHANGED = 1
+CHECK_ERROR = 2
+
+# Версия парсера: увеличивается при изменении логики разбора,
+# чтобы кеш результатов парсинга пересобрался
+PARSER_VERSION = 9
 
 # Русские названия дней недели для отладки
-DAYS_OF_WEEK = ["Понедельник", "Вторник", "Среда", "Четверг", "Пятница", "Суббота", "Воскресенье"]
 
 def debug_print(message):
     """Функция для отладочной печати"""
     print(f"🔍 {message}")
 
-def parse_xls_schedule(xls_content, group_name):
-    try:
-        debug_print(f"Парсинг XLS для группы {group_name}")
-        
-        import xlrd
-        workbook = xlrd.open_workbook(file_contents=xls_content)
-        sheet = workbook.sheet_by_index(0)
-        
-        debug_print(f"✅ XLS файл открыт: {sheet.nrows} строк, {sheet.ncols} колонок")
+# Шаблон названия группы в шапке листа, например "ББИ-25-2"
+GROUP_NAME_PATTERN = re.compile(r'[А-ЯЁ]{2,6}-\d{2}-\d+')
+
+def parse_lesson_number(cell_value):
+    """Возвращает номер пары из ячейки колонки 1 или None"""
+    if cell_value.isdigit() and 1 <= int(cell_value) <= 7:
+        return int(cell_value)
+    return None
+
+def build_group_index(grid, group_names=None, header_end=None):
+    """Строит индекс «группа → колонка» за один проход по листу.
+
+    Если group_names не задан, в индекс попадают все группы, найденные
+    по GROUP_NAME_PATTERN; иначе ищутся только указанные группы.
+    Названия ищутся только в шапке — строках выше header_end (первой
+    строки с парой), иначе ячейка занятия вроде «Поток ББИ-25-2 ...»
+    отдала бы группу чужой колонке. Каждая колонка проверяется одним
+    поиском по склеенному тексту шапки.
+    """
+    wanted = None if group_names is None else set(group_names)
+    group_index = {}
+    
+    for col_idx, column in enumerate(grid):
+        column_text = '\n'.join(value for value in column[:header_end] if value)
+        if not column_text:
+            continue
         
-        # Ищем группу
-        group_col = None
-        for row_idx in range(sheet.nrows):
-            for col_idx in range(sheet.ncols):
-                cell_value = str(sheet.cell_value(row_idx, col_idx)).strip()
-                if group_name in cell_value:
-                    group_col = col_idx
-                    debug_print(f"✅ Группа найдена: строка {row_idx}, колонка {col_idx}")
-                    break
-            if group_col is not None:
+        if wanted is None:
+            for name in GROUP_NAME_PATTERN.findall(column_text):
+                group_index.setdefault(name, col_idx)
+        else:
+            for name in wanted:
+                if name not in group_index and name in column_text:
+                    group_index[name] = col_idx
+            if len(group_index) == len(wanted):
                 break
+    
+    return group_index
+
+def build_slot_index(grid):
+    """Строит индекс строк с парами: список (строка, номер пары, день).
+
+    Новый день начинается, когда номер пары уменьшается по сравнению
+    с предыдущей строкой (например, после 7-й пары снова идет 1-я).
+    Строки после седьмого дня отбрасываются с предупреждением: такого
+    дня нет ни в календаре семестра, ни в масках занятости.
+    """
+    if len(grid) < 2:
+        return []
+    
+    numbered_rows = [(row_idx, parse_lesson_number(value))
+                     for row_idx, value in enumerate(grid[1]) if value.isdigit()]
+    
+    slot_index = []
+    current_day = -1
+    last_lesson_number = 0
+    
+    for row_idx, lesson_number in numbered_rows:
+        if lesson_number is None:
+            continue
         
-        if group_col is None:
-            debug_print("❌ Группа не найдена в файле")
-            return []
-        
-        # Ищем номера пар в колонке 1
-        lesson_numbers = []
-        for row_idx in range(sheet.nrows):
-            cell_value = str(sheet.cell_value(row_idx, 1)).strip()
-            if cell_value.isdigit() and 1 <= int(cell_value) <= 7:
-                lesson_numbers.append((row_idx, int(cell_value)))
-        
-        if not lesson_numbers:
-            debug_print("❌ Не найдены номера пар")
-            return []
+        if current_day < 0 or lesson_number < last_lesson_number:
+            current_day += 1
+        last_lesson_number = lesson_number
         
-        debug_print(f"✅ Найдено {len(lesson_numbers)} номеров пар")
+        if not is_valid_slot(current_day, lesson_number):
+            debug_print(f"⚠️ На листе больше {DAYS_PER_WEEK} дней: пары со строки {row_idx + 1} пропущены")
+            break
+        slot_index.append((row_idx, lesson_number, current_day))
+    
+    return slot_index
+
+def extract_group_lessons(grid, group_col, slot_index, merged=None, shared=None, default_week=WEEK_ALL):
+    """Извлекает занятия одной группы по готовому индексу строк с парами.
+
+    merged — индекс объединенных ячеек «(строка, колонка) → якорь»: занятие
+    потока записано один раз в левой верхней ячейке объединения, которое
+    накрывает колонки нескольких групп и иногда две пары. shared — общий
+    для листа словарь уже созданных занятий таких ячеек: каждое объединение
+    разбирается один раз, а группы получают ссылки на одни и те же объекты.
+    default_week — четность листа для занятий без отметки недели в ячейке.
+    """
+    merged = merged or {}
+    shared = {} if shared is None else shared
+    column = grid[group_col]
+    lessons = []
+    
+    for lesson_row, lesson_number, day in slot_index:
+        if lesson_number not in LESSON_TIMES:
+            continue
         
-        # Извлекаем занятия
-        lessons = []
-        current_day = -1
-        last_lesson_number = 0
+        anchor = merged.get((lesson_row, group_col))
+        if anchor is None:
+            lesson = _build_lesson(column[lesson_row], lesson_number, day, default_week)
+        else:
+            key = (anchor, lesson_number, day)
+            if key in shared:
+                lesson = shared[key]
+            else:
+                anchor_row, anchor_col = anchor
+                lesson = shared[key] = _build_lesson(grid[anchor_col][anchor_row], lesson_number, day,
+                                                     default_week)
         
-        for i, (lesson_row, lesson_number) in enumerate(lesson_numbers):
-            if lesson_number in LESSON_TIMES:
-                start_time, end_time = LESSON_TIMES[lesson_number]
-                duration = calculate_duration(start_time, end_time)
-                
-                # Получаем информацию о занятии
-                lesson_cell_value = str(sheet.cell_value(lesson_row, group_col)).strip()
-                
-                if lesson_cell_value and lesson_cell_value != 'nan' and lesson_cell_value != '':
-                    lesson_info = parse_lesson_cell_detailed(lesson_cell_value)
-                    if lesson_info and lesson_info["subject"] != "1":
-                        # Определяем день недели: новый день начинается когда номер пары становится 1
-                        if lesson_number == 1 and (last_lesson_number != 1 or i == 0):
-                            current_day += 1
-                        
-                        last_lesson_number = lesson_number
-                        
-                        lesson = {
-                            "subject": lesson_info["subject"],
-                            "day": current_day,  # 0=понедельник, 1=вторник и т.д.
-                            "start_time": start_time,
-                            "duration": duration,
-                            "location": lesson_info.get("location", "Не указано"),
-                            "teacher": lesson_info.get("teacher", "Не указан"),
-                            "type": lesson_info.get("type", "Занятие")
-                        }
-                        lessons.append(lesson)
-                        
-                        day_name = DAYS_OF_WEEK[current_day] if current_day < len(DAYS_OF_WEEK) else f"День {current_day}"
-                        debug_print(f"✅ {lesson['subject']} - {day_name} {start_time} ({lesson['type']})")
+        if lesson is not None:
+            lessons.append(lesson)
+    
+    return lessons
+
+def _build_lesson(cell_value, lesson_number, day, default_week=WEEK_ALL):
+    """Занятие из текста ячейки или None для пустой ячейки"""
+    if not cell_value or cell_value == 'nan':
+        return None
+    
+    lesson_info = parse_lesson_cell_detailed(cell_value)
+    if not lesson_info or lesson_info["subject"] == "1":
+        return None
+    
+    return Lesson(
+        lesson_info["subject"],
+        day,  # 0=понедельник, 1=вторник и т.д.
+        lesson_number,
+        location=lesson_info.get("location", "Не указано"),
+        teacher=lesson_info.get("teacher", "Не указан"),
+        type=lesson_info.get("type", "Занятие"),
+        week=lesson_info.get("week", WEEK_ALL) or default_week,
+    )
+
+def column_fingerprint(grid, group_col, slot_index, merged=None, default_week=WEEK_ALL):
+    """Отпечаток колонки группы: SHA-1 текста ее ячеек по парам с учетом объединений и четности листа"""
+    digest = hashlib.sha1(f"{default_week}\x1e".encode('utf-8'))
+    for lesson_row, lesson_number, day in slot_index:
+        anchor = merged.get((lesson_row, group_col)) if merged else None
+        row_idx, col_idx = anchor or (lesson_row, group_col)
+        digest.update(f"{day}:{lesson_number}:{grid[col_idx][row_idx]}\x1e".encode('utf-8'))
+    return digest.hexdigest()
+
+def sheet_week(sheet_name):
+    """Четность недели по названию листа («Нечетная неделя», «2 нед.») или WEEK_ALL"""
+    match = WEEK_PATTERN.search(sheet_name or '')
+    return _week_from_marker(match.group(1)) if match else WEEK_ALL
+
+def parse_sheet_grid(grid, group_names=None, merged=None, previous=None, sheet_name=None):
+    """Разбирает один лист (список колонок) в «группа → (отпечаток колонки, занятия)».
+
+    merged — индекс объединенных ячеек листа (см. workbook_reader.build_merge_index),
+    previous — колонки этого листа из прошлой редакции: если отпечаток
+    колонки группы не изменился, занятия берутся оттуда без разбора ячеек.
+    Если недели разнесены по листам, четность из названия листа
+    достается занятиям без отметки недели в ячейке.
+    """
+    nrows = len(grid[0]) if grid else 0
+    debug_print(f"✅ Лист загружен: {nrows} строк, {len(grid)} колонок, "
+                f"{len(set((merged or {}).values()))} объединений")
+    
+    with span("group_lookup") as record:
+        slot_index = build_slot_index(grid)
+        header_end = slot_index[0][0] if slot_index else None
+        group_index = build_group_index(grid, group_names, header_end)
+        record["items"] = len(group_index)
+    
+    if not group_index:
+        debug_print("ℹ️ Группы на листе не найдены")
+        return {}
+    
+    debug_print(f"✅ Найдено групп: {len(group_index)}")
+    
+    if not slot_index:
+        debug_print("❌ Не найдены номера пар")
+        return {}
+    
+    days_count = slot_index[-1][2] + 1
+    debug_print(f"✅ Найдено {len(slot_index)} номеров пар за {days_count} дней")
+    
+    week = sheet_week(sheet_name)
+    if week != WEEK_ALL:
+        debug_print(f"✅ Лист «{sheet_name}»: {'нечетные' if week == WEEK_ODD else 'четные'} недели")
+    
+    previous = previous or {}
+    columns = {}
+    shared = {}
+    reused = 0
+    with span("cell_parsing") as record:
+        for group, group_col in group_index.items():
+            fingerprint = column_fingerprint(grid, group_col, slot_index, merged, week)
+            previous_column = previous.get(group)
+            if previous_column and previous_column[0] == fingerprint:
+                columns[group] = previous_column
+                reused += 1
+                continue
+            lessons = extract_group_lessons(grid, group_col, slot_index, merged, shared, week)
+            columns[group] = (fingerprint, lessons)
+            debug_print(f"✅ {group}: {len(lessons)} занятий (колонка {group_col})")
+        record["items"] = sum(len(lessons) for _, lessons in columns.values())
+        record["reused"] = reused
+    
+    if reused:
+        debug_print(f"ℹ️ Колонки без изменений: {reused} групп, занятия взяты из прошлой редакции")
+    return columns
+
+def parse_xls_columns(xls_content, group_names=None, processes=None, previous=None):
+    """Парсит книгу (.xls или .xlsx) и возвращает колонки групп по листам.
+
+    Результат — список «группа → (отпечаток колонки, занятия)» для каждого
+    листа; previous — такой же список прошлой редакции для повторного
+    использования неизменившихся колонок. Без group_names возвращаются
+    все группы, иначе только указанные. Листы книги разбираются
+    параллельно, processes=1 отключает пул процессов.
+    """
+    try:
+        debug_print("Парсинг XLS для всех групп" if group_names is None
+                    else f"Парсинг XLS для групп: {', '.join(group_names)}")
         
-        debug_print(f"✅ Всего извлечено {len(lessons)} занятий за {current_day + 1} дней")
-        return lessons
+        sheets = parse_workbook(xls_content, parse_sheet_grid, group_names, processes, previous)
+        if not any(sheets):
+            debug_print("❌ Группы не найдены в файле")
+        return sheets
         
     except Exception as e:
         debug_print(f"❌ Ошибка при парсинге XLS: {e}")
@@ -116,268 +297,600 @@ def parse_xls_schedule(xls_content, group_name):
         debug_print(f"Детали ошибки: {traceback.format_exc()}")
         return []
 
-def parse_lesson_cell_detailed(cell_text):
-    """Детальный парсинг ячейки с сохранением всей информации"""
-    if not cell_text or cell_text.strip() == '' or cell_text == 'nan':
-        return None
+def merge_sheets(sheets):
+    """Объединяет колонки листов в «группа → занятия» и сообщает о пересечениях между листами"""
+    conflicts = []
+    lessons_by_group = merge_lessons(sheets, conflicts)
+    for group, lesson in conflicts:
+        debug_print(f"⚠️ {group}: «{lesson.subject}» ({day_name(lesson.day)}, {lesson.slot} пара) пересекается "
+                    f"с занятием на другом листе и пропущено")
+    return lessons_by_group
+
+def parse_xls_all_groups(xls_content, group_names=None, processes=None):
+    """Парсит книгу (.xls или .xlsx) и возвращает словарь «группа → занятия»"""
+    return merge_sheets(parse_xls_columns(xls_content, group_names, processes))
+
+def parse_xls_schedule(xls_content, group_name):
+    """Парсит XLS и возвращает занятия одной группы"""
+    lessons = parse_xls_all_groups(xls_content, [group_name]).get(group_name, [])
     
-    text = ' '.join(cell_text.strip().split())  # Убираем лишние пробелы и переносы
+    for lesson in lessons:
+        debug_print(f"✅ {lesson.subject} - {day_name(lesson.day)} {lesson.start_time} ({lesson.type})")
     
-    lesson_info = {}
+    return lessons
+
+# Тип занятия в скобках, например "(Практические)"
+LESSON_TYPE_PATTERN = re.compile(r'\((Лекционные|Практические|Лабораторные)\)')
+LESSON_TYPE_NAMES = {
+    "Лекционные": "Лекция",
+    "Практические": "Практика",
+    "Лабораторные": "Лабораторная"
+}
+
+# Преподаватель в формате "Фамилия И.О." или "Фамилия И. О."
+TEACHER_PATTERN = re.compile(r'(?<!\S)([А-ЯЁ][а-яё]+(?:-[А-ЯЁ][а-яё]+)?) ([А-ЯЁ])\. ?([А-ЯЁ])\.(?!\S)')
+
+# Аудитория, например "Б-412" или "Л550"
+LOCATION_PATTERN = re.compile(r'[А-Яа-яA-Za-z]-?\d+[А-Яа-яA-Za-z]?')
+
+# Четность недели в ячейке, например "(1 нед.)", "II нед.", "нечет. нед." или "по четным неделям".
+# Отметка и "нед..." — отдельные слова, чтобы не находить их в "Учет недвижимости" или "11 неделя"
+WEEK_PATTERN = re.compile(r'\(?(?:(?<![\w-])по )?(?<![\w-])(II|I|1|2|[Нн]еч[её]т\w*\.?|[Чч][её]т\w*\.?) ?'
+                          r'[Нн]ед(?:ел[а-яё]*)?\.?(?!\w)\)?')
+
+# Размер кеша разобранных ячеек: текст ячеек сильно повторяется по неделям и группам
+CELL_CACHE_SIZE = 4096
+
+def _week_from_marker(marker):
+    """WEEK_ODD или WEEK_EVEN по отметке недели из WEEK_PATTERN"""
+    return WEEK_ODD if marker in ('I', '1') or marker[:3].lower() == 'неч' else WEEK_EVEN
+
+@lru_cache(maxsize=CELL_CACHE_SIZE)
+def _parse_normalized_cell(text):
+    """Разбирает нормализованный текст ячейки в кортеж (тип, предмет, преподаватель, аудитория, неделя)"""
+    week = WEEK_ALL
+    week_match = WEEK_PATTERN.search(text)
+    if week_match:
+        week = _week_from_marker(week_match.group(1))
+        text = ' '.join((text[:week_match.start()] + text[week_match.end():]).split())
     
-    # Извлекаем тип занятия
-    if '(Лекционные)' in text:
-        lesson_info["type"] = "Лекция"
-        subject = text.replace('(Лекционные)', '').strip()
-    elif '(Практические)' in text:
-        lesson_info["type"] = "Практика" 
-        subject = text.replace('(Практические)', '').strip()
-    elif '(Лабораторные)' in text:
-        lesson_info["type"] = "Лабораторная"
-        subject = text.replace('(Лабораторные)', '').strip()
+    type_match = LESSON_TYPE_PATTERN.search(text)
+    if type_match:
+        lesson_type = LESSON_TYPE_NAMES[type_match.group(1)]
+        subject = ' '.join((text[:type_match.start()] + text[type_match.end():]).split())
     else:
-        lesson_info["type"] = "Занятие"
+        lesson_type = "Занятие"
         subject = text
     
-    # Разделяем предмет и преподавателя
-    parts = subject.split()
-    
-    # Ищем преподавателя в формате "Фамилия И.О."
-    teacher_found = False
-    for i in range(len(parts) - 1):
-        if (len(parts[i]) >= 2 and 
-            re.match(r'^[А-ЯЁ][а-яё]*$', parts[i]) and 
-            re.match(r'^[А-ЯЁ]\.[А-ЯЁ]\.$', parts[i+1])):
-            lesson_info["teacher"] = f"{parts[i]} {parts[i+1]}"
-            lesson_info["subject"] = ' '.join(parts[:i])
-            teacher_found = True
-            break
-    
-    if not teacher_found:
-        lesson_info["subject"] = subject
-        lesson_info["teacher"] = "Не указан"
-    
-    # Ищем аудиторию в тексте
-    location_match = re.search(r'[А-Яа-яA-Za-z]-?\d+[А-Яа-яA-Za-z]?', text)
-    if location_match:
-        lesson_info["location"] = location_match.group()
+    teacher_match = TEACHER_PATTERN.search(subject)
+    if teacher_match:
+        surname, first_initial, middle_initial = teacher_match.groups()
+        teacher = f"{surname} {first_initial}.{middle_initial}."
+        subject = subject[:teacher_match.start()].strip()
     else:
-        lesson_info["location"] = "Не указано"
+        teacher = "Не указан"
     
-    return lesson_info
-
-def calculate_duration(start_time, end_time):
-    start = datetime.strptime(start_time, "%H:%M")
-    end = datetime.strptime(end_time, "%H:%M")
-    return int((end - start).total_seconds() / 60)
-
-def schedule_to_ical(lessons, group_name):
-    """Создает iCal календарь с повторяющимися событиями"""
-    calendar = Calendar()
+    location_match = LOCATION_PATTERN.search(text)
+    location = location_match.group() if location_match else "Не указано"
     
-    # Добавляем метаданные для календаря
-    calendar.extra.append('X-WR-CALNAME:' + f'Расписание {group_name}')
-    calendar.extra.append('X-WR-CALDESC:' + f'Расписание занятий для группы {group_name}')
-    calendar.extra.append('X-WR-TIMEZONE:Europe/Moscow')
+    return lesson_type, subject, teacher, location, week
+
+def parse_lesson_cell_detailed(cell_text):
+    """Детальный парсинг ячейки с сохранением всей информации"""
+    if not cell_text:
+        return None
     
-    for lesson in lessons:
-        # Определяем дату первого занятия для этого дня недели
-        first_lesson_date = START_DATE + timedelta(days=lesson["day"])
-        
-        # Парсим время начала
-        start_time = datetime.strptime(lesson["start_time"], "%H:%M").time()
-        start_datetime = datetime.combine(first_lesson_date.date(), start_time)
-        start_datetime = TIMEZONE.localize(start_datetime)
-        
-        # Добавляем продолжительность
-        end_datetime = start_datetime + timedelta(minutes=lesson["duration"])
-        
-        # Создаем событие
-        event = Event()
-        event.name = f"{lesson['subject']} ({lesson['type']})"
-        event.begin = start_datetime
-        event.end = end_datetime
-        event.location = lesson["location"]
-        event.description = f"Группа: {group_name}\nПреподаватель: {lesson['teacher']}\nТип: {lesson['type']}\nАудитория: {lesson['location']}"
-        
-        # Настраиваем еженедельное повторение до конца семестра
-        event.rrule = {
-            "FREQ": "WEEKLY",
-            "UNTIL": END_DATE
-        }
-        
-        calendar.events.add(event)
-        
-        day_name = DAYS_OF_WEEK[lesson["day"]] if lesson["day"] < len(DAYS_OF_WEEK) else f"День {lesson['day']}"
-        debug_print(f"📅 Создано событие: {lesson['subject']} - каждый {day_name} {start_time}")
+    text = ' '.join(cell_text.split())  # Убираем лишние пробелы и переносы
+    if not text or text == 'nan':
+        return None
     
-    debug_print(f"✅ Создан iCal календарь с {len(calendar.events)} повторяющимися событиями")
-    return calendar
+    lesson_type, subject, teacher, location, week = _parse_normalized_cell(text)
+    return {
+        "type": lesson_type,
+        "subject": subject,
+        "teacher": teacher,
+        "location": location,
+        "week": week
+    }
 
-def calculate_schedule_hash(lessons):
-    """Вычисляет хеш расписания для отслеживания изменений"""
-    schedule_data = []
-    for lesson in lessons:
-        schedule_data.append(f"{lesson['subject']}_{lesson['day']}_{lesson['start_time']}_{lesson['location']}")
-    
-    schedule_str = ''.join(schedule_data)
-    return hashlib.md5(schedule_str.encode()).hexdigest()
+def schedule_to_ical(lessons, group_name):
+    """Возвращает генератор строк iCal с повторяющимися событиями"""
+    debug_print(f"📅 Создание iCal календаря: {len(lessons)} повторяющихся событий")
+    return iter_calendar_lines(lessons, group_name, SEMESTER)
 
 def get_latest_schedule_url():
     """Получает последнюю ссылку на расписание с сайта МИСИС"""
     debug_print("Поиск актуальной ссылки на расписание...")
     try:
-        url = "https://misis.ru/students/schedule/"
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-        }
-        response = requests.get(url, timeout=10, headers=headers)
-        response.raise_for_status()
-        
-        soup = BeautifulSoup(response.content, 'html.parser')
-        debug_print("Страница расписания загружена")
-        
-        # Ищем все ссылки на XLS файлы
-        all_links = soup.find_all('a', href=re.compile(r'\.xls$'))
-        debug_print(f"Найдено {len(all_links)} XLS ссылок")
-        
-        # Ищем ссылки связанные с ИТКН
-        itkn_links = []
-        for link in all_links:
-            href = link.get('href', '').lower()
-            text = link.get_text().lower()
-            
-            if any(keyword in text for keyword in ['иткн', 'институт компьютерных', 'компьютерных', 'икн']):
-                itkn_links.append(link)
-            elif 'itkn' in href or 'ikn' in href:
-                itkn_links.append(link)
-        
-        itkn_links.sort(key=lambda x: extract_date_from_filename(x.get('href', '')), reverse=True)
-        
-        if itkn_links:
-            latest_link = itkn_links[0]
-            schedule_url = urljoin(url, latest_link['href'])
-            link_text = latest_link.get_text().strip()
-            debug_print(f"✅ Найдена ИТКН ссылка: {link_text} -> {schedule_url}")
-            return schedule_url
-        
-        if all_links:
-            schedule_url = urljoin(url, all_links[0]['href'])
-            debug_print(f"⚠️ ИТКН ссылка не найдена, использую первую XLS: {schedule_url}")
-            return schedule_url
-        
-        debug_print("❌ Ссылки не найдены")
-        return None
+        page_content, page_modified = cached_get(SCHEDULE_PAGE_URL, timeout=10)
+        debug_print("Страница расписания загружена" if page_modified
+                    else "Страница расписания не изменилась, используется кеш")
+        return find_latest_schedule_url(page_content)
         
     except Exception as e:
         debug_print(f"Ошибка при получении ссылки: {e}")
         return None
 
-def extract_date_from_filename(filename):
-    date_match = re.search(r'(\d{6})', filename)
-    if date_match:
-        return date_match.group(1)
-    return "000000"
+def rebase_file_url(url):
+    """Переносит ссылку на файл на FILES_BASE_URL, сохраняя путь"""
+    if not FILES_BASE_URL:
+        return url
+    base = urlsplit(FILES_BASE_URL)
+    parts = urlsplit(url)
+    return urlunsplit((base.scheme, base.netloc, base.path.rstrip('/') + parts.path, parts.query, ''))
+
+def is_itkn_link(link):
+    """Относится ли ссылка к ИТКН по тексту, разделу страницы или пути файла"""
+    text = f"{link.text} {link.institute or ''}".lower()
+    if any(keyword in text for keyword in ITKN_KEYWORDS):
+        return True
+    # Признак может быть и в каталоге: /upload/itkn/raspisanie.xls
+    path = urlsplit(link.url).path.lower()
+    return 'itkn' in path or 'ikn' in path
+
+def group_course(group_name, start_date=START_DATE):
+    """Курс группы по году поступления из названия или None.
+
+    ББИ-25-2 в семестре, начинающемся в сентябре 2025 или феврале 2026, — 1 курс.
+    """
+    match = GROUP_YEAR_PATTERN.search(group_name)
+    if not match:
+        return None
+    admission_year = 2000 + int(match.group(1))
+    return start_date.year - admission_year + (1 if start_date.month >= 9 else 0)
+
+def find_latest_schedule_url(page_content):
+    """Выбирает ссылку на последнее расписание ИТКН из HTML страницы"""
+    # Разбор страницы останавливается после раздела ИТКН
+    all_links = find_schedule_links(page_content, SCHEDULE_PAGE_URL, institute=ITKN_INSTITUTE)
+    debug_print(f"Найдено {len(all_links)} ссылок на файлы расписания")
+    
+    itkn_links = [link for link in all_links if is_itkn_link(link)]
+    # Файлы разных курсов лежат рядом: берем курс группы, если он указан в тексте ссылок
+    course = group_course(GROUP_NAME)
+    course_links = [link for link in itkn_links if link.course == course]
+    itkn_links = latest_first(course_links or itkn_links)
+    
+    if itkn_links:
+        latest_link = itkn_links[0]
+        schedule_url = rebase_file_url(latest_link.url)
+        debug_print(f"✅ Найдена ИТКН ссылка: {latest_link.text} -> {schedule_url}")
+        return schedule_url
+    
+    if all_links:
+        schedule_url = rebase_file_url(all_links[0].url)
+        debug_print(f"⚠️ ИТКН ссылка не найдена, использую первую ссылку: {schedule_url}")
+        return schedule_url
+    
+    debug_print("❌ Ссылки не найдены")
+    return None
+
+def get_all_schedule_urls():
+    """Возвращает ссылки на все файлы расписания (.xls, .xlsx) со страницы"""
+    debug_print("Поиск всех ссылок на расписание...")
+    try:
+        page_content, _ = cached_get(SCHEDULE_PAGE_URL, timeout=10)
+        
+        urls = [rebase_file_url(link.url) for link in find_schedule_links(page_content, SCHEDULE_PAGE_URL)]
+        urls = list(dict.fromkeys(urls))
+        debug_print(f"Найдено {len(urls)} ссылок на файлы расписания")
+        return urls
+        
+    except Exception as e:
+        debug_print(f"Ошибка при получении ссылок: {e}")
+        return []
+
+def mirror_path(dest_dir, url, used_paths):
+    """Путь файла в зеркале: путь ссылки внутри dest_dir.
+
+    Одинаковые имена файлов из разных каталогов не перезаписывают друг
+    друга; если путь все же совпал (ссылки отличаются только запросом),
+    к имени добавляется номер.
+    """
+    parts = [part for part in unquote(urlsplit(url).path).split('/') if part not in ('', '.', '..')]
+    path = os.path.join(dest_dir, *parts) if parts else os.path.join(dest_dir, 'schedule.xls')
+    stem, extension = os.path.splitext(path)
+    number = 2
+    while path in used_paths:
+        path = f"{stem}-{number}{extension}"
+        number += 1
+    used_paths.add(path)
+    return path
+
+def mirror_all_schedules(dest_dir):
+    """Параллельно скачивает все файлы расписания в каталог dest_dir"""
+    from fetcher import fetch_all
+
+    urls = get_all_schedule_urls()
+    if not urls:
+        debug_print("❌ Ссылки не найдены")
+        return False
+    
+    os.makedirs(dest_dir, exist_ok=True)
+    results = fetch_all(urls)
+    
+    failed = 0
+    used_paths = set()
+    for url, result in results.items():
+        if result is None:
+            debug_print(f"❌ Не удалось скачать: {url}")
+            failed += 1
+            continue
+        
+        content, modified = result
+        path = mirror_path(dest_dir, url, used_paths)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        if modified or not os.path.exists(path):
+            with open(path, 'wb') as f:
+                f.write(content)
+        debug_print(f"{'✅' if modified else 'ℹ️'} {os.path.relpath(path, dest_dir)} ({len(content)} байт)")
+    
+    debug_print(f"✅ Скачано файлов: {len(results) - failed} из {len(results)}")
+    return failed == 0
 
 def download_schedule_file(url):
+    """Скачивает файл расписания и возвращает (содержимое, изменился ли файл)"""
     try:
         debug_print(f"Скачивание файла: {url}")
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-        }
-        response = requests.get(url, timeout=30, headers=headers)
-        response.raise_for_status()
+        content, modified = cached_get(url, timeout=30)
         
-        if len(response.content) < 100:
+        if len(content) < 100:
             debug_print("❌ Файл слишком маленький, возможно ошибка")
-            return None
-            
-        debug_print(f"✅ Файл успешно скачан ({len(response.content)} байт)")
-        return response.content
+            return None, False
+        
+        if modified:
+            debug_print(f"✅ Файл успешно скачан ({len(content)} байт)")
+        else:
+            debug_print(f"ℹ️ Файл не изменился, используется кеш ({len(content)} байт)")
+        return content, modified
     except Exception as e:
         debug_print(f"❌ Ошибка при скачивании файла: {e}")
-        return None
+        return None, False
+
+def send_telegram_notification(message, is_error=False, diff=None):
+    """Ставит сообщение в очередь Telegram; diff — изменения группы из schedule_diff.
+
+    Сообщения отправляются в flush_notifications() в конце обработки.
+    """
+    import notifier
 
-def send_telegram_notification(message, is_error=False):
     try:
         bot_token = os.getenv('TELEGRAM_BOT_TOKEN')
-        chat_id = os.getenv('TELEGRAM_CHAT_ID')
+        chat_ids = notifier.chat_ids_from_env()
         
-        if not bot_token or not chat_id:
+        if not bot_token or not chat_ids:
             debug_print("❌ Telegram токен или chat_id не установлены")
             return
-            
-        debug_print("Отправка уведомления в Telegram...")
         
-        url = f"https://api.telegram.org/bot{bot_token}/sendMessage"
-        payload = {
-            'chat_id': chat_id,
-            'text': message,
-            'parse_mode': 'HTML'
-        }
+        if diff:
+            message = f"{message}\n\n{format_group_diff(diff)}"
         
-        response = requests.post(url, json=payload, timeout=10)
-        if response.status_code == 200:
-            debug_print("✅ Уведомление отправлено в Telegram")
-        else:
-            debug_print(f"❌ Ошибка отправки в Telegram: {response.status_code} - {response.text}")
+        outbox = notifier.Outbox()
+        for chat_id in chat_ids:
+            outbox.add(chat_id, message)
+        debug_print(f"Уведомление поставлено в очередь для {len(chat_ids)} чатов")
             
+    except Exception as e:
+        debug_print(f"❌ Ошибка при постановке уведомления в очередь: {e}")
+
+def flush_notifications():
+    """Отправляет накопленные уведомления, включая оставшиеся с прошлых запусков"""
+    bot_token = os.getenv('TELEGRAM_BOT_TOKEN')
+    if not bot_token:
+        return
+    import notifier
+
+    try:
+        sent, pending = notifier.flush(bot_token, log=debug_print)
+        if sent:
+            debug_print(f"✅ Отправлено сообщений в Telegram: {sent}")
+        if pending:
+            debug_print(f"ℹ️ В очереди осталось уведомлений: {pending}")
     except Exception as e:
         debug_print(f"❌ Ошибка при отправке в Telegram: {e}")
 
-def main():
+def remember_schedule_url(url):
+    """Запоминает ссылку на обработанный файл расписания"""
+    os.makedirs(os.path.dirname(LATEST_URL_PATH), exist_ok=True)
+    with open(LATEST_URL_PATH, 'w', encoding='utf-8') as f:
+        f.write(url)
+
+def load_remembered_schedule_url():
+    try:
+        with open(LATEST_URL_PATH, 'r', encoding='utf-8') as f:
+            return f.read().strip() or None
+    except OSError:
+        return None
+
+def build_key(xls_content, args):
+    """Ключ результата полного запуска: файл, версии парсера и отрисовки, семестр и настройки вывода.
+
+    Если ключ совпал с сохраненным, schedule.ics и calendars/ уже собраны
+    из этого файла текущим кодом и обработку можно пропустить; смена
+    PARSER_VERSION, RENDER_VERSION или календаря семестра ее не пропустит.
+    """
+    import calendar_output
+
+    parts = (cache_key(xls_content, PARSER_VERSION), calendar_output.RENDER_VERSION, SEMESTER.fingerprint(),
+             GROUP_NAME, os.path.abspath(args.calendars), args.teacher_calendars, args.room_calendars)
+    return hashlib.sha256(repr(parts).encode('utf-8')).hexdigest()
+
+def remember_build_key(key):
+    os.makedirs(os.path.dirname(BUILD_KEY_PATH), exist_ok=True)
+    with open(BUILD_KEY_PATH, 'w', encoding='utf-8') as f:
+        f.write(key)
+
+def load_build_key():
+    try:
+        with open(BUILD_KEY_PATH, 'r', encoding='utf-8') as f:
+            return f.read().strip() or None
+    except OSError:
+        return None
+
+def check_for_updates(pooled=False):
+    """Быстрая проверка изменений без скачивания и парсинга XLS.
+
+    Делает условный запрос страницы и HEAD к последнему обработанному
+    файлу, сравнивая их с сохраненным состоянием. Ссылка со страницы
+    (новой или взятой из кеша при 304) всегда сравнивается с последним
+    обработанным файлом: полный запуск сохраняет страницу в кеш до
+    скачивания файла, и если скачивание не удалось, новая ссылка иначе
+    осталась бы незамеченной. Состояние обновляет полный запуск;
+    исключение — pooled=True (режим --watch): запросы идут
+    через общую сессию с пулом соединений, а изменившаяся страница, на
+    которой ссылка на файл осталась прежней, сохраняется в кеш, чтобы
+    следующие циклы получали 304 и не разбирали ее заново. Возвращает
+    CHECK_UNCHANGED, CHECK_CHANGED или CHECK_ERROR.
+    """
+    def request(url, method, timeout=10):
+        """(код, заголовки, тело, ответ requests или None)"""
+        if not pooled:
+            return conditional_request(url, method=method, timeout=timeout) + (None,)
+        response = session_conditional_request(url, method=method, timeout=timeout)
+        body = response.content if method == 'GET' and response.status_code != 304 else b''
+        return response.status_code, response.headers, body, response
+    
+    try:
+        schedule_url = load_remembered_schedule_url()
+        if not schedule_url:
+            debug_print("ℹ️ Нет сохраненного состояния, нужен полный запуск")
+            return CHECK_CHANGED
+        
+        _, cached_page = load_cached_response(SCHEDULE_PAGE_URL)
+        status, _, page_content, page_response = request(SCHEDULE_PAGE_URL, 'GET')
+        page_changed = status != 304 and page_content != cached_page
+        page_content = page_content if status != 304 else cached_page
+        if page_content is None:
+            debug_print("ℹ️ Страница не сохранена в кеше, нужен полный запуск")
+            return CHECK_CHANGED
+        if find_latest_schedule_url(page_content) != schedule_url:
+            debug_print("✅ Появилась новая ссылка на расписание")
+            return CHECK_CHANGED
+        if page_changed and page_response is not None:
+            # Ссылка прежняя: страницу можно считать обработанной
+            store_response(SCHEDULE_PAGE_URL, page_response)
+        
+        meta, _ = load_cached_response(schedule_url)
+        if not meta or not (meta.get('etag') or meta.get('last_modified')):
+            # Сервер не отдает валидаторы: сравниваем содержимое
+            status, _, xls_content, _ = request(schedule_url, 'GET', timeout=30)
+            _, cached_xls = load_cached_response(schedule_url)
+            changed = status != 304 and xls_content != cached_xls
+        else:
+            status, headers, _, _ = request(schedule_url, 'HEAD')
+            changed = status != 304 and (
+                headers.get('ETag') != meta.get('etag')
+                or headers.get('Last-Modified') != meta.get('last_modified'))
+        
+        debug_print("✅ Файл расписания изменился" if changed else "ℹ️ Изменений нет")
+        return CHECK_CHANGED if changed else CHECK_UNCHANGED
+        
+    except Exception as e:
+        debug_print(f"❌ Ошибка при проверке изменений: {e}")
+        return CHECK_ERROR
+
+def poll_for_updates(args):
+    """Один цикл режима --watch: проверка и полная обработка при изменении"""
+    status = check_for_updates(pooled=True)
+    if status == CHECK_ERROR:
+        raise RuntimeError("не удалось проверить изменения")
+    if status == CHECK_CHANGED:
+        try:
+            main(args)
+        finally:
+            flush_notifications()
+    return status == CHECK_CHANGED
+
+def run_watch(args):
+    """Держит процесс запущенным и опрашивает сайт до SIGTERM"""
+    stop_event = threading.Event()
+    watcher.install_signal_handlers(stop_event)
+    after_cycle = (lambda: write_metrics(args.metrics)) if args.metrics else None
+    debug_print("=== Режим наблюдения ===")
+    watcher.watch(lambda: poll_for_updates(args), START_DATE, stop_event, interval=args.interval,
+                  after_cycle=after_cycle, log=debug_print)
+    return 0
+
+def save_to_history(lessons_by_group, xls_content, schedule_url):
+    """Записывает разобранную ревизию в историю SQLite"""
+    import history_store
+
+    if (os.path.exists(STATE_PATH) and not os.path.exists(history_store.DB_PATH)
+            and not os.path.exists(history_store.LEGACY_DB_PATH)):
+        # Расписание уже обрабатывалось, а базы нет: история начнется заново
+        debug_print(f"⚠️ База истории {history_store.DB_PATH} не найдена, создается новая")
+    try:
+        connection = history_store.connect()
+        try:
+            revision_id = history_store.record_revision(
+                connection, lessons_by_group, content_hash(xls_content), PARSER_VERSION, schedule_url)
+        finally:
+            connection.close()
+        debug_print(f"✅ Ревизия {revision_id} сохранена в историю")
+    except Exception as e:
+        debug_print(f"❌ Ошибка при сохранении истории: {e}")
+
+def main(args=None):
+    import calendar_output
+
+    if args is None:
+        args = parse_args([])
+    if args.calendars is None:
+        args.calendars = calendar_output.OUTPUT_DIR
     debug_print("=== Начало обработки расписания ===")
     
-    schedule_url = get_latest_schedule_url()
+    with span("link_discovery") as record:
+        schedule_url = get_latest_schedule_url()
+        record["items"] = 1 if schedule_url else 0
     if not schedule_url:
         error_msg = "❌ Не удалось получить ссылку на расписание"
         debug_print(error_msg)
         send_telegram_notification(error_msg, is_error=True)
         return
     
-    xls_content = download_schedule_file(schedule_url)
+    with span("download", url=schedule_url) as record:
+        xls_content, xls_modified = download_schedule_file(schedule_url)
+        record["bytes"] = len(xls_content) if xls_content else 0
+        record["modified"] = xls_modified
     if not xls_content:
         error_msg = "❌ Не удалось скачать файл расписания"
         debug_print(error_msg)
         send_telegram_notification(error_msg, is_error=True)
         return
     
-    lessons = parse_xls_schedule(xls_content, GROUP_NAME)
+    remember_schedule_url(schedule_url)
+    
+    key = build_key(xls_content, args)
+    manifest_path = os.path.join(args.calendars, calendar_output.MANIFEST_NAME)
+    if (not xls_modified and load_build_key() == key
+            and os.path.exists('schedule.ics') and os.path.exists(manifest_path)):
+        debug_print("ℹ️ Файл расписания не изменился, парсинг пропущен")
+        debug_print("=== Обработка завершена ===")
+        return
+    
+    lessons_by_group = load_parsed_schedule(xls_content, PARSER_VERSION)
+    if lessons_by_group is not None:
+        debug_print("✅ Результат парсинга взят из кеша")
+    else:
+        # Новая редакция: заново разбираются только изменившиеся колонки групп
+        sheets = parse_xls_columns(xls_content, previous=load_column_cache(PARSER_VERSION))
+        lessons_by_group = merge_sheets(sheets)
+        if lessons_by_group:
+            store_parsed_schedule(xls_content, PARSER_VERSION, lessons_by_group)
+            store_column_cache(PARSER_VERSION, sheets)
+    
+    lessons = lessons_by_group.get(GROUP_NAME)
     if not lessons:
         error_msg = "❌ Не удалось распарсить расписание"
         debug_print(error_msg)
         send_telegram_notification(error_msg, is_error=True)
         return
     
-    calendar = schedule_to_ical(lessons, GROUP_NAME)
+    with span("history_store") as record:
+        save_to_history(lessons_by_group, xls_content, schedule_url)
+        record["items"] = sum(len(group_lessons) for group_lessons in lessons_by_group.values())
     
-    # Сохраняем календарь в файл
-    with open('schedule.ics', 'w', encoding='utf-8') as f:
-        f.writelines(calendar)
+    with span("ics_render", items=len(lessons)) as record:
+        calendar = schedule_to_ical(lessons, GROUP_NAME)
+        
+        # Сохраняем календарь в файл
+        with open('schedule.ics', 'w', encoding='utf-8', newline='') as f:
+            f.writelines(calendar)
+        record["bytes"] = os.path.getsize('schedule.ics')
     
     debug_print("✅ Календарь сохранен как schedule.ics")
     
-    # Проверяем изменения
-    current_hash = calculate_schedule_hash(lessons)
+    with span("calendar_output") as record:
+        stats = calendar_output.write_calendars(
+            lessons_by_group, SEMESTER, args.calendars,
+            teachers=args.teacher_calendars, rooms=args.room_calendars)
+        record["items"] = stats["written"]
+    debug_print(f"✅ Календари в {args.calendars}: записано {stats['written']}, "
+                f"без изменений {stats['unchanged']}, удалено {stats['removed']}")
     
-    previous_hash = ""
-    if os.path.exists('last_hash.txt'):
-        with open('last_hash.txt', 'r') as f:
-            previous_hash = f.read().strip()
+    # Проверяем изменения по каждому занятию
+    with span("hash_diff", items=sum(len(group_lessons) for group_lessons in lessons_by_group.values())):
+        previous_state = load_state()
+        current_state = build_state(lessons_by_group)
+        changes = diff_states(previous_state, current_state)
     
-    if current_hash != previous_hash:
-        debug_print("✅ Обнаружены изменения в расписании")
+    if changes:
+        debug_print(f"✅ Обнаружены изменения в расписании: {len(changes)} групп")
         
-        with open('last_hash.txt', 'w') as f:
-            f.write(current_hash)
+        save_state(current_state)
+        save_json(CHANGES_PATH, {"source": schedule_url, "groups": changes})
         
-        days_count = max(lesson["day"] for lesson in lessons) + 1 if lessons else 0
-        change_msg = f"📅 Расписание для {GROUP_NAME} обновлено!\n\nЗанятий: {len(lessons)}\nДней в неделе: {days_count}\nСсылка для подписки: https://raw.githubusercontent.com/dmitry207/misis-itkn-schedule/main/schedule.ics"
-        send_telegram_notification(change_msg)
+        group_diff = changes.get(GROUP_NAME)
+        if group_diff:
+            days_count = max(lesson.day for lesson in lessons) + 1 if lessons else 0
+            change_msg = f"📅 Расписание для {GROUP_NAME} обновлено!\n\nЗанятий: {len(lessons)}\nДней в неделе: {days_count}\nСсылка для подписки: https://raw.githubusercontent.com/dmitry207/misis-itkn-schedule/main/schedule.ics"
+            if previous_state is None:
+                send_telegram_notification(change_msg)
+            else:
+                change_msg += f"\n\nИзменений: {count_changes(group_diff)}"
+                send_telegram_notification(change_msg, diff=group_diff)
     else:
         debug_print("ℹ️ Изменений в расписании нет")
     
+    # Ключ записывается последним: прерванный запуск не будет пропущен в следующий раз
+    remember_build_key(key)
     debug_print("=== Обработка завершена ===")
 
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Парсер расписания МИСИС")
+    parser.add_argument('--check', action='store_true',
+                        help="только проверить, изменилось ли расписание "
+                             "(код выхода 0 — нет, 1 — да, 2 — ошибка)")
+    parser.add_argument('--mirror', metavar='DIR',
+                        help="скачать все файлы расписания со страницы в каталог DIR")
+    parser.add_argument('--metrics', metavar='PATH',
+                        help="сохранить замеры этапов в PATH (.prom — формат Prometheus, иначе JSON lines)")
+    parser.add_argument('--calendars', metavar='DIR',
+                        help="каталог для календарей по группам и manifest.json "
+                             "(по умолчанию calendars)")
+    parser.add_argument('--teacher-calendars', action='store_true',
+                        help="также создать календари преподавателей")
+    parser.add_argument('--room-calendars', action='store_true',
+                        help="также создать календари аудиторий")
+    parser.add_argument('--watch', action='store_true',
+                        help="не завершаться, а опрашивать сайт и пересобирать календарь при изменениях")
+    parser.add_argument('--interval', type=float, metavar='SECONDS',
+                        help="фиксированный интервал опроса для --watch вместо адаптивного")
+    parser.add_argument('--profile', metavar='PATH',
+                        help="запустить под cProfile и сохранить статистику в PATH")
+    return parser.parse_args(argv)
+
+def run(args):
+    if args.check:
+        return check_for_updates()
+    if args.mirror:
+        return 0 if mirror_all_schedules(args.mirror) else 1
+    if args.watch:
+        return run_watch(args)
+    try:
+        main(args)
+    finally:
+        flush_notifications()
+    return 0
+
+def run_with_profile(args):
+    """Запускает обработку под cProfile и печатает самые затратные функции"""
+    import cProfile
+    import pstats
+    
+    profiler = cProfile.Profile()
+    try:
+        return profiler.runcall(run, args)
+    finally:
+        profiler.dump_stats(args.profile)
+        pstats.Stats(profiler).sort_stats('cumulative').print_stats(20)
+        debug_print(f"Профиль сохранен в {args.profile}")
+
 if __name__ == "__main__":
-    main()
+    args = parse_args()
+    try:
+        exit_code = run_with_profile(args) if args.profile else run(args)
+    finally:
+        if args.metrics:
+            write_metrics(args.metrics)
+    sys.exit(exit_code)
@@ -0,0 +1,94 @@
+"""Календарь семестра: номера и четность недель, праздники и переносы.
+
+Календарь строится один раз на семестр. Для каждого сочетания дня
+недели и четности заранее вычисляются дата первого занятия, даты,
+выпадающие на праздники (EXDATE), и рабочие дни по переносу (RDATE),
+так что каждое занятие превращается в одно правило RRULE без
+разворачивания в отдельные события.
+
+Неделя, в которую попадает начало семестра, считается первой (нечетной).
+"""
+from datetime import timedelta
+
+from lesson_model import WEEK_ALL, WEEK_EVEN, WEEK_ODD
+
+class Semester:
+    """Календарь семестра.
+
+    holidays — нерабочие даты; transfers — словарь «рабочая дата →
+    дата, по расписанию которой идут занятия». Дата, с которой перенесены
+    занятия, автоматически считается нерабочей.
+    """
+
+    def __init__(self, start_date, end_date, holidays=(), transfers=None):
+        self.start_date = start_date
+        self.end_date = end_date
+        self.transfers = {work.date() if hasattr(work, 'date') else work:
+                          source.date() if hasattr(source, 'date') else source
+                          for work, source in (transfers or {}).items()}
+        self.holidays = {day.date() if hasattr(day, 'date') else day for day in holidays}
+        self.holidays.update(self.transfers.values())
+
+        self.first_monday = start_date.date() - timedelta(days=start_date.weekday())
+        self._first_dates = {}
+        self._exdates = {}
+        self._rdates = {}
+        for weekday in range(7):
+            for week in (WEEK_ALL, WEEK_ODD, WEEK_EVEN):
+                self._build(weekday, week)
+
+    def week_number(self, date):
+        """Номер учебной недели, начиная с 1"""
+        return (date - self.first_monday).days // 7 + 1
+
+    def week_parity(self, date):
+        return WEEK_ODD if self.week_number(date) % 2 else WEEK_EVEN
+
+    def _matches(self, date, week):
+        return week == WEEK_ALL or self.week_parity(date) == week
+
+    def _build(self, weekday, week):
+        key = (weekday, week)
+        start = self.start_date.date()
+        end = self.end_date.date()
+
+        date = self.first_monday + timedelta(days=weekday)
+        while date < start or not self._matches(date, week):
+            date += timedelta(days=7)
+        if date > end:
+            self._first_dates[key] = None
+            self._exdates[key] = []
+            self._rdates[key] = []
+            return
+
+        step = timedelta(days=14 if week != WEEK_ALL else 7)
+        occurrences = []
+        while date <= end:
+            occurrences.append(date)
+            date += step
+
+        self._first_dates[key] = occurrences[0]
+        self._exdates[key] = [day for day in occurrences if day in self.holidays]
+        self._rdates[key] = sorted(work for work, source in self.transfers.items()
+                                   if source.weekday() == weekday and self._matches(source, week)
+                                   and start <= work <= end)
+
+    def first_date(self, weekday, week=WEEK_ALL):
+        """Дата первого занятия или None, если в семестре таких дней нет"""
+        return self._first_dates.get((weekday, week))
+
+    def exdates(self, weekday, week=WEEK_ALL):
+        """Даты занятий, выпадающие на нерабочие дни"""
+        return self._exdates.get((weekday, week), [])
+
+    def rdates(self, weekday, week=WEEK_ALL):
+        """Дополнительные даты занятий в рабочие дни по переносу"""
+        return self._rdates.get((weekday, week), [])
+
+    def interval(self, week):
+        """INTERVAL правила RRULE: занятия по четным или нечетным неделям идут раз в две недели"""
+        return 1 if week == WEEK_ALL else 2
+
+    def fingerprint(self):
+        """Строка, которая меняется вместе с границами семестра, праздниками или переносами"""
+        return repr((self.start_date, self.end_date, sorted(self.holidays), sorted(self.transfers.items())))
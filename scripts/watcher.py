@@ -0,0 +1,76 @@
+"""Режим наблюдения: процесс остается запущенным и периодически опрашивает сайт.
+
+Между циклами сохраняются HTTP-сессия с открытыми соединениями, кеш
+разбора ячеек и дисковые кеши, поэтому каждая проверка стоит одного-двух
+условных запросов. Интервал опроса адаптивный: рядом с началом семестра,
+когда расписание меняется чаще всего, сайт опрашивается чаще. После
+ошибок интервал растет экспоненциально, ко всем интервалам добавляется
+случайный разброс, чтобы несколько экземпляров не стучались одновременно.
+SIGTERM и SIGINT завершают цикл после текущей проверки.
+"""
+import random
+import signal
+import threading
+from datetime import datetime, timedelta
+
+from metrics import reset, span
+
+FAST_INTERVAL = 10 * 60        # секунд, рядом с началом семестра
+SLOW_INTERVAL = 60 * 60        # секунд, в остальное время
+FAST_WINDOW = timedelta(days=14)
+MAX_BACKOFF = 6 * 60 * 60
+JITTER = 0.1
+
+def poll_interval(now, semester_start, fast=FAST_INTERVAL, slow=SLOW_INTERVAL, window=FAST_WINDOW):
+    """Базовый интервал опроса: fast в окне ±window вокруг начала семестра"""
+    if abs(now - semester_start) <= window:
+        return fast
+    return slow
+
+def backoff_interval(interval, errors, max_delay=MAX_BACKOFF):
+    """Интервал после errors ошибок подряд"""
+    if not errors:
+        return interval
+    return min(interval * 2 ** errors, max_delay)
+
+def with_jitter(delay, jitter=JITTER):
+    return delay * random.uniform(1 - jitter, 1 + jitter)
+
+def install_signal_handlers(stop_event):
+    """SIGTERM и SIGINT выставляют stop_event вместо немедленного выхода"""
+    def handle(signum, frame):
+        stop_event.set()
+
+    for signum in (signal.SIGTERM, signal.SIGINT):
+        signal.signal(signum, handle)
+
+def watch(poll, semester_start, stop_event=None, interval=None, after_cycle=None, log=print):
+    """Вызывает poll() до выставления stop_event.
+
+    poll() возвращает True, если расписание изменилось и было пересобрано,
+    и бросает исключение при ошибке. interval задает фиксированный
+    базовый интервал вместо адаптивного. after_cycle() вызывается после
+    каждого цикла, пока замеры этого цикла еще доступны.
+    """
+    stop_event = stop_event or threading.Event()
+    errors = 0
+
+    while not stop_event.is_set():
+        reset()
+        try:
+            with span("watch_cycle") as record:
+                record["changed"] = poll()
+            errors = 0
+        except Exception as e:
+            errors += 1
+            log(f"❌ Ошибка цикла наблюдения ({errors} подряд): {e}")
+
+        if after_cycle:
+            after_cycle()
+
+        base = interval or poll_interval(datetime.now(), semester_start)
+        delay = with_jitter(backoff_interval(base, errors))
+        log(f"⏳ Следующая проверка через {delay / 60:.1f} мин")
+        stop_event.wait(delay)
+
+    log("ℹ️ Наблюдение остановлено")
@@ -0,0 +1,299 @@
+"""Единое чтение книг расписания в форматах .xls и .xlsx.
+
+Формат определяется по сигнатуре файла: .xls читается через xlrd,
+.xlsx — через openpyxl в потоковом режиме read_only. Каждый лист
+загружается в список колонок строк (grid), объединенные ячейки листа —
+в индекс «(строка, колонка) → якорь объединения». Листы книги (курсы, недели)
+могут разбираться параллельно в пуле процессов, после чего колонки групп
+всех листов объединяются в один словарь «группа → занятия».
+"""
+import io
+import os
+import re
+
+from lesson_model import WEEK_ALL
+from metrics import span
+
+XLS_SIGNATURE = b'\xd0\xcf\x11\xe0'  # OLE2 Compound Document
+XLSX_SIGNATURE = b'PK\x03\x04'       # ZIP-архив Office Open XML
+
+# Объединения в XML листа .xlsx: <mergeCell ref="C5:F6"/> после </sheetData>
+MERGE_CELL_PATTERN = re.compile(rb'<(?:\w+:)?mergeCell\s+ref="([A-Z]+\d+:[A-Z]+\d+)"')
+# Конец данных листа: </sheetData> или пустой <sheetData/>
+SHEET_DATA_END_PATTERN = re.compile(rb'</(?:\w+:)?sheetData\s*>|<(?:\w+:)?sheetData\s*/>')
+XML_CHUNK_SIZE = 64 * 1024
+# Сколько байт конца куска сохранить, чтобы не разрезать тег конца данных
+SHEET_DATA_END_OVERLAP = 64
+
+def detect_format(content):
+    """Возвращает 'xls' или 'xlsx' по первым байтам файла"""
+    if content.startswith(XLSX_SIGNATURE):
+        return 'xlsx'
+    if content.startswith(XLS_SIGNATURE):
+        return 'xls'
+    raise ValueError("Неизвестный формат файла расписания")
+
+def normalize_cell_value(value):
+    """Приводит значение ячейки к строке без лишних пробелов"""
+    if value is None:
+        return ''
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value).strip()
+
+def _open_xls(content):
+    import xlrd
+
+    # formatting_info нужен xlrd, чтобы прочитать объединенные ячейки
+    return xlrd.open_workbook(file_contents=content, on_demand=True, formatting_info=True)
+
+def _open_xlsx(content):
+    import openpyxl
+
+    return openpyxl.load_workbook(io.BytesIO(content), read_only=True, data_only=True)
+
+def open_workbook(content):
+    """Открывает книгу; возвращает (формат, книга)"""
+    workbook_format = detect_format(content)
+    if workbook_format == 'xls':
+        return workbook_format, _open_xls(content)
+    return workbook_format, _open_xlsx(content)
+
+def close_workbook(workbook_format, workbook):
+    if workbook_format == 'xls':
+        workbook.release_resources()
+    else:
+        workbook.close()
+
+def workbook_sheet_count(workbook_format, workbook):
+    if workbook_format == 'xls':
+        return workbook.nsheets
+    return len(workbook.sheetnames)
+
+def workbook_sheet_names(workbook_format, workbook):
+    if workbook_format == 'xls':
+        return workbook.sheet_names()
+    return list(workbook.sheetnames)
+
+def sheet_count(content):
+    """Число листов в книге"""
+    workbook_format, workbook = open_workbook(content)
+    try:
+        return workbook_sheet_count(workbook_format, workbook)
+    finally:
+        close_workbook(workbook_format, workbook)
+
+def _iter_workbook_rows(workbook_format, workbook, sheet_index):
+    if workbook_format == 'xls':
+        sheet = workbook.sheet_by_index(sheet_index)
+        for row_idx in range(sheet.nrows):
+            yield tuple(sheet.row_values(row_idx))
+    else:
+        yield from workbook.worksheets[sheet_index].iter_rows(values_only=True)
+
+def iter_sheet_rows(content, sheet_index=0):
+    """Построчно выдает исходные значения ячеек листа (None для пустых в .xlsx)"""
+    workbook_format, workbook = open_workbook(content)
+    try:
+        yield from _iter_workbook_rows(workbook_format, workbook, sheet_index)
+    finally:
+        close_workbook(workbook_format, workbook)
+
+def workbook_sheet_grid(workbook_format, workbook, sheet_index):
+    """Загружает лист открытой книги в список колонок нормализованных строк.
+
+    Для .xls колонки читаются целиком через sheet.col_values, для .xlsx
+    строки читаются потоком и транспонируются в колонки.
+    """
+    if workbook_format == 'xls':
+        sheet = workbook.sheet_by_index(sheet_index)
+        return [[normalize_cell_value(value) for value in sheet.col_values(col_idx)]
+                for col_idx in range(sheet.ncols)]
+
+    rows = [[normalize_cell_value(value) for value in row]
+            for row in _iter_workbook_rows(workbook_format, workbook, sheet_index)]
+    width = max((len(row) for row in rows), default=0)
+    for row in rows:
+        row.extend([''] * (width - len(row)))
+    return [list(column) for column in zip(*rows)]
+
+def workbook_merged_ranges(workbook_format, workbook, sheet_index):
+    """Объединенные диапазоны листа в виде (rlo, rhi, clo, chi), границы hi не включаются.
+
+    В режиме read_only openpyxl не читает объединения, поэтому для .xlsx
+    они ищутся в хвосте XML листа после данных.
+    """
+    if workbook_format == 'xls':
+        return list(workbook.sheet_by_index(sheet_index).merged_cells)
+
+    from openpyxl.utils.cell import range_boundaries
+
+    with _worksheet_source(workbook.worksheets[sheet_index]) as src:
+        refs = list(iter_merge_refs(src))
+    ranges = []
+    for ref in refs:
+        min_col, min_row, max_col, max_row = range_boundaries(ref.decode('ascii'))
+        ranges.append((min_row - 1, max_row, min_col - 1, max_col))
+    return ranges
+
+def _worksheet_source(worksheet):
+    """Файловый объект с XML листа из архива .xlsx.
+
+    У ReadOnlyWorksheet нет публичного доступа к исходному XML, поэтому
+    используется приватный _get_source() — он есть в openpyxl 3.0–3.1,
+    в requirements.txt версия закреплена (3.1.2). При обновлении openpyxl
+    проверить, что метод не переименован.
+    """
+    return worksheet._get_source()
+
+def iter_merge_refs(src, chunk_size=XML_CHUNK_SIZE):
+    """Ссылки объединений (b"C5:F6") из XML листа, читаемого кусками.
+
+    Пока не найден конец данных листа, в памяти держится только текущий
+    кусок; регулярное выражение применяется лишь к хвосту после него.
+    """
+    buffer = b''
+    while True:
+        chunk = src.read(chunk_size)
+        if not chunk:
+            raise ValueError("В XML листа не найден конец sheetData")
+        buffer += chunk
+        match = SHEET_DATA_END_PATTERN.search(buffer)
+        if match:
+            buffer = buffer[match.end():]
+            break
+        buffer = buffer[-SHEET_DATA_END_OVERLAP:]
+
+    while True:
+        # Разбираются только завершенные теги, незаконченный переходит в следующий кусок
+        cut = buffer.rfind(b'>') + 1
+        yield from MERGE_CELL_PATTERN.findall(buffer, 0, cut)
+        buffer = buffer[cut:]
+        chunk = src.read(chunk_size)
+        if not chunk:
+            return
+        buffer += chunk
+
+def build_merge_index(ranges):
+    """Индекс «(строка, колонка) → (строка, колонка) якоря» для всех ячеек объединений.
+
+    Якорь — левая верхняя ячейка диапазона, только в ней хранится значение.
+    """
+    merged = {}
+    for rlo, rhi, clo, chi in ranges:
+        anchor = (rlo, clo)
+        for row_idx in range(rlo, rhi):
+            for col_idx in range(clo, chi):
+                merged[row_idx, col_idx] = anchor
+    return merged
+
+def workbook_sheet_merges(workbook_format, workbook, sheet_index):
+    return build_merge_index(workbook_merged_ranges(workbook_format, workbook, sheet_index))
+
+def load_sheet_grid(content, sheet_index=0):
+    """Загружает один лист книги в список колонок нормализованных строк"""
+    workbook_format, workbook = open_workbook(content)
+    try:
+        return workbook_sheet_grid(workbook_format, workbook, sheet_index)
+    finally:
+        close_workbook(workbook_format, workbook)
+
+def parse_sheet(content, sheet_index, sheet_parser, group_names=None, previous=None):
+    """Загружает один лист и разбирает его функцией sheet_parser(grid, group_names, merged, previous, sheet_name)"""
+    with span("sheet_load", bytes=len(content), sheet=sheet_index) as record:
+        workbook_format, workbook = open_workbook(content)
+        try:
+            grid = workbook_sheet_grid(workbook_format, workbook, sheet_index)
+            merged = workbook_sheet_merges(workbook_format, workbook, sheet_index)
+            sheet_name = workbook_sheet_names(workbook_format, workbook)[sheet_index]
+        finally:
+            close_workbook(workbook_format, workbook)
+        record["items"] = len(grid) * (len(grid[0]) if grid else 0)
+    return sheet_parser(grid, group_names, merged, previous, sheet_name)
+
+def _weeks_overlap(first, second):
+    return first == second or WEEK_ALL in (first, second)
+
+def merge_lessons(sheets, conflicts=None):
+    """Объединяет колонки всех листов в словарь «группа → занятия».
+
+    Обычно листы — разные курсы и группы в них не пересекаются. Если
+    группа встречается на нескольких листах (например, недели на отдельных
+    листах), занятия разных листов в одной паре допустимы, только когда
+    они относятся к разным неделям (четность ставит sheet_parser по ячейке
+    или названию листа). Иначе в календаре получилось бы два наложенных
+    события, а в состоянии diff одно молча заменило бы другое: такое
+    занятие не добавляется, а пара (группа, занятие) попадает в список
+    conflicts, если он передан. Остается занятие листа с меньшим номером.
+    """
+    sheets_by_group = {}
+    for columns in sheets:
+        for group in columns:
+            sheets_by_group[group] = sheets_by_group.get(group, 0) + 1
+
+    lessons_by_group = {}
+    occupied = {}
+    for sheet_index, columns in enumerate(sheets):
+        for group, (_, lessons) in columns.items():
+            group_lessons = lessons_by_group.setdefault(group, [])
+            if sheets_by_group[group] == 1:
+                group_lessons.extend(lessons)
+                continue
+
+            # Группа на нескольких листах: проверяем пары на пересечение недель
+            group_slots = occupied.setdefault(group, {})
+            for lesson in lessons:
+                taken = group_slots.setdefault((lesson.day, lesson.slot), [])
+                if any(other_sheet != sheet_index and _weeks_overlap(week, lesson.week)
+                       for other_sheet, week in taken):
+                    if conflicts is not None:
+                        conflicts.append((group, lesson))
+                    continue
+                taken.append((sheet_index, lesson.week))
+                group_lessons.append(lesson)
+    return lessons_by_group
+
+def parse_workbook(content, sheet_parser, group_names=None, processes=None, previous=None):
+    """Разбирает все листы книги; возвращает список результатов по листам.
+
+    sheet_parser(grid, group_names, merged, previous, sheet_name) должен
+    быть функцией уровня модуля, чтобы его можно было передать в дочерний
+    процесс, и возвращать колонки листа: «группа → (отпечаток колонки,
+    занятия)». merged — индекс объединенных ячеек из build_merge_index,
+    previous — колонки того же листа из прошлой ревизии
+    (previous[sheet_index]) или None, sheet_name — название листа. Если листов больше одного и processes не равен 1, листы
+    разбираются в пуле процессов; иначе книга открывается один раз и
+    листы разбираются по очереди.
+    """
+    def previous_sheet(sheet_index):
+        return previous[sheet_index] if previous and sheet_index < len(previous) else None
+
+    with span("workbook_open", bytes=len(content)) as record:
+        workbook_format, workbook = open_workbook(content)
+        sheet_names = workbook_sheet_names(workbook_format, workbook)
+        sheets = len(sheet_names)
+        record["items"] = sheets
+
+    if sheets > 1 and processes != 1:
+        from concurrent.futures import ProcessPoolExecutor
+
+        close_workbook(workbook_format, workbook)
+        workers = min(processes or os.cpu_count() or 1, sheets)
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(parse_sheet, content, sheet_index, sheet_parser, group_names,
+                                       previous_sheet(sheet_index))
+                       for sheet_index in range(sheets)]
+            return [future.result() for future in futures]
+
+    try:
+        results = []
+        for sheet_index in range(sheets):
+            with span("sheet_load", sheet=sheet_index) as record:
+                grid = workbook_sheet_grid(workbook_format, workbook, sheet_index)
+                merged = workbook_sheet_merges(workbook_format, workbook, sheet_index)
+                record["items"] = len(grid) * (len(grid[0]) if grid else 0)
+            results.append(sheet_parser(grid, group_names, merged, previous_sheet(sheet_index),
+                                        sheet_names[sheet_index]))
+        return results
+    finally:
+        close_workbook(workbook_format, workbook)